@@ -4,10 +4,97 @@ import shutil
 from pathlib import Path
 import subprocess
 
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
 # Ensure using current Python environment
 sys.executable = sys.executable
 
-def build_exe():
+# Large binary packages copied verbatim into _internal/vendor when building with --vendor
+# (import name -> distribution name), skipping PyInstaller's per-binary analysis
+VENDOR_PACKAGES = {
+    'torch': 'torch',
+    'transformers': 'transformers',
+    'faiss': 'faiss_cpu',
+}
+
+# Runtime dependencies of the vendored packages that PyInstaller can no longer discover
+VENDOR_DEPENDENCY_IMPORTS = [
+    'huggingface_hub',
+    'safetensors',
+    'regex',
+    'yaml',
+    'requests',
+    'tqdm',
+    'filelock',
+    'fsspec',
+    'jinja2',
+    'networkx',
+    'sympy',
+    'packaging',
+    'typing_extensions',
+]
+
+def rmtree_fast(path):
+    """Remove a directory tree in a single os.scandir pass (no extra stat per entry)."""
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                rmtree_fast(entry.path)
+            else:
+                os.unlink(entry.path)
+    os.rmdir(path)
+
+def _fast_rm(path):
+    """Remove a directory tree using the native OS command, falling back to rmtree_fast."""
+    if os.name == 'nt':
+        cmd = ['cmd', '/c', 'rd', '/s', '/q', path]
+    else:
+        cmd = ['rm', '-rf', path]
+    try:
+        subprocess.run(cmd, check=True, shell=False)
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        rmtree_fast(path)
+
+def copy_vendor_packages(vendor_dst):
+    """Copy VENDOR_PACKAGES (with their dist-info and bundled libs) from site-packages.
+
+    Args:
+        vendor_dst: Destination directory added to sys.path by lightragcoder.py at startup
+    """
+    import importlib.util
+
+    os.makedirs(vendor_dst, exist_ok=True)
+    for import_name, dist_name in VENDOR_PACKAGES.items():
+        spec = importlib.util.find_spec(import_name)
+        if spec is None or not spec.submodule_search_locations:
+            print(f"Warning: vendor package {import_name} not found, skipping")
+            continue
+
+        package_src = Path(list(spec.submodule_search_locations)[0])
+        site_packages = package_src.parent
+
+        # Package itself, its metadata (needed by importlib.metadata version checks) and auditwheel libs
+        sources = [package_src, site_packages / f"{dist_name}.libs"]
+        sources += site_packages.glob(f"{dist_name}-*.dist-info")
+        for src in sources:
+            if src.is_dir():
+                shutil.copytree(src, os.path.join(vendor_dst, src.name), dirs_exist_ok=True)
+        print(f"Vendored {import_name} from {package_src}")
+
+def get_project_version(project_dir):
+    """Read the project version from pyproject.toml."""
+    with open(os.path.join(project_dir, 'pyproject.toml'), 'rb') as f:
+        return tomllib.load(f)['project']['version']
+
+def build_exe(vendor=False):
+    """Build the LightRAGCoder executable with PyInstaller.
+
+    Args:
+        vendor: Copy VENDOR_PACKAGES verbatim instead of letting PyInstaller analyze them
+    """
     # Project root directory
     project_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -17,21 +104,28 @@ def build_exe():
     spec_file = os.path.join(project_dir, 'lightragcoder.spec')
 
     if os.path.exists(dist_dir):
-        shutil.rmtree(dist_dir)
+        _fast_rm(dist_dir)
     if os.path.exists(build_dir):
-        shutil.rmtree(build_dir)
+        _fast_rm(build_dir)
     if os.path.exists(spec_file):
         os.remove(spec_file)
 
     print("Cleanup completed, starting EXE build...")
 
+    # Embed version as a module so the EXE does not need to parse pyproject.toml
+    version_dir = os.path.join(build_dir, 'version')
+    os.makedirs(version_dir, exist_ok=True)
+    with open(os.path.join(version_dir, '_version.py'), 'w', encoding='utf-8') as f:
+        f.write(f'__version__ = "{get_project_version(project_dir)}"\n')
+
     # PyInstaller build parameters
     pyinstaller_cmd = [
         sys.executable,
         '-m', 'PyInstaller',
-        # '--onefile',  # Generate single EXE file
-        '--onedir',
+        '--onedir',  # Directory bundle: no per-launch unpack to a temp dir
         '--name', 'LightRAGCoder',  # Output file name
+        '--paths', version_dir,  # Make generated _version module importable
+        '--hidden-import', '_version',  # Embedded version string
         '--hidden-import', 'asyncio',  # Ensure asyncio is included
         '--hidden-import', 'queue',  # Ensure queue module is included
         '--hidden-import', 'mcp',  # Ensure mcp is included
@@ -43,24 +137,56 @@ def build_exe():
         '--hidden-import', 'lightrag.llm.hf',  # Ensure lightrag.llm.hf is included
         '--hidden-import', 'lightrag.utils',  # Ensure lightrag.utils is included
         '--hidden-import', 'lightrag.base',  # Ensure lightrag.base is included
+        '--hidden-import', 'anthropic',  # Ensure anthropic is included
+        '--hidden-import', 'openai',  # Ensure openai is included
+        '--hidden-import', 'google.genai',  # Ensure google.genai is included
+        '--hidden-import', 'google.genai.types',  # Ensure google.genai.types is included
+        '--hidden-import', 'transformers.models.auto.modeling_auto',  # AutoModel
+        '--hidden-import', 'transformers.models.auto.tokenization_auto',  # AutoTokenizer
+        '--hidden-import', 'transformers.models.qwen2.tokenization_qwen2',  # Qwen tokenizer (hf_cache)
+        '--hidden-import', 'transformers.models.qwen2.tokenization_qwen2_fast',  # Qwen fast tokenizer (hf_cache)
+        '--hidden-import', 'transformers.models.xlm_roberta.modeling_xlm_roberta',  # Default HF embedding model (BAAI/bge-m3)
+        '--hidden-import', 'transformers.models.xlm_roberta.tokenization_xlm_roberta_fast',  # Default HF tokenizer (BAAI/bge-m3)
+        '--hidden-import', 'faiss',  # Ensure faiss is included
+        '--hidden-import', 'numpy',  # Ensure numpy is included
+        '--hidden-import', 'orjson',  # Optional fast JSON for settings.json
+        '--hidden-import', 'h2',  # Optional HTTP/2 support for the embedding HTTP client
+        '--collect-submodules', 'mcp.server.lowlevel',  # Ensure mcp.server.lowlevel module is included
         '--collect-submodules', 'importlib.metadata',  # Ensure importlib.metadata module is included
         '--collect-submodules', 'lightrag_hku',  # Ensure lightrag_hku module is included
         '--collect-submodules', 'tree_sitter',  # Ensure tree_sitter module is included
-        '--collect-submodules', 'anthropic',  # Ensure anthropic module is included
-        '--collect-submodules', 'openai',  # Ensure openai module is included
-        '--collect-submodules', 'google_genai',  # Ensure google_genai module is included
-        '--collect-submodules', 'transformers',  # Ensure transformers module is included
-        '--collect-submodules', 'torch',  # Ensure torch module is included
-        '--collect-submodules', 'numpy',  # Ensure numpy module is included
         '--collect-submodules', 'tokenizers',  # Ensure tokenizers module is included
-        '--collect-submodules', 'sentence_transformers',  # Ensure sentence_transformers module is included
-        '--collect-submodules', 'faiss',  # Ensure faiss module is included
         '--collect-submodules', 'tiktoken',  # Ensure tiktoken module is included
+        '--exclude-module', 'onnxruntime',  # Optional backend, not used
+        '--exclude-module', 'sentence_transformers',  # Not imported by the project
+        '--exclude-module', 'transformers.models.deprecated',  # Deprecated model implementations
+        '--exclude-module', 'torch.utils.tensorboard',  # Training-only utilities
+        '--noupx',  # Don't UPX-compress binaries (slow to load, breaks torch DLLs)
         '--console',  # Show console window for debugging
         '--clean',  # Clean temporary files
-        os.path.join(project_dir, 'lightragcoder.py')  # Main script
     ]
 
+    if vendor:
+        # Drop analysis hints for vendored packages and exclude them from analysis entirely
+        vendored = tuple(VENDOR_PACKAGES)
+        filtered_cmd = []
+        for arg in pyinstaller_cmd:
+            if filtered_cmd and filtered_cmd[-1] == '--hidden-import' and arg.split('.')[0] in vendored:
+                filtered_cmd.pop()
+                continue
+            filtered_cmd.append(arg)
+        pyinstaller_cmd = filtered_cmd
+        for import_name in VENDOR_PACKAGES:
+            pyinstaller_cmd += ['--exclude-module', import_name]
+        for import_name in VENDOR_DEPENDENCY_IMPORTS:
+            pyinstaller_cmd += ['--hidden-import', import_name]
+
+    # Strip debug symbols from bundled shared libraries (not supported on Windows)
+    if os.name != 'nt':
+        pyinstaller_cmd.append('--strip')
+
+    pyinstaller_cmd.append(os.path.join(project_dir, 'lightragcoder.py'))  # Main script
+
     # Execute PyInstaller build command
     try:
         subprocess.run(pyinstaller_cmd, check=True, shell=False)
@@ -74,16 +200,20 @@ def build_exe():
         env_example_src = os.path.join(project_dir, '.env.example')
         env_example_dst = os.path.join(dist_dir, 'LightRAGCoder', '.env.example')
         if os.path.exists(env_example_src):
-            shutil.copy2(env_example_src, env_example_dst)
+            shutil.copyfile(env_example_src, env_example_dst)
             print(f"Copied .env.example to {dist_dir}/LightRAGCoder")
 
         internal_dir = os.path.join(dist_dir, 'LightRAGCoder', '_internal')
 
+        # Copy vendored packages verbatim (no PyInstaller analysis)
+        if vendor:
+            copy_vendor_packages(os.path.join(internal_dir, 'vendor'))
+
         # Copy pyproject.toml for version information
         pyproject_src = os.path.join(project_dir, 'pyproject.toml')
         pyproject_dst = os.path.join(internal_dir, 'pyproject.toml')
         if os.path.exists(pyproject_src):
-            shutil.copy2(pyproject_src, pyproject_dst)
+            shutil.copyfile(pyproject_src, pyproject_dst)
             print(f"Copied pyproject.toml to {internal_dir}")
 
         # Copy tiktoken_ext directory from .venv\Lib\site-packages\tiktoken_ext
@@ -91,7 +221,7 @@ def build_exe():
         tiktoken_ext_dst = os.path.join(internal_dir, 'tiktoken_ext')
         if os.path.exists(tiktoken_ext_src):
             if os.path.exists(tiktoken_ext_dst):
-                shutil.rmtree(tiktoken_ext_dst)
+                rmtree_fast(tiktoken_ext_dst)
             shutil.copytree(tiktoken_ext_src, tiktoken_ext_dst)
             print(f"Copied tiktoken_ext to {tiktoken_ext_dst}")
         else:
@@ -104,7 +234,7 @@ def build_exe():
             cache_dst = os.path.join(internal_dir, cache_dir)
             if os.path.exists(cache_src):
                 if os.path.exists(cache_dst):
-                    shutil.rmtree(cache_dst)
+                    rmtree_fast(cache_dst)
                 shutil.copytree(cache_src, cache_dst)
                 print(f"Copied {cache_dir} to {cache_dst}")
             else:
@@ -114,9 +244,9 @@ def build_exe():
         print("\n======== Build Completed ========")
         print(f"Executable: {os.path.join(dist_dir, 'LightRAGCoder', 'LightRAGCoder.exe')}")
         print("\nUsage:")
-        print("1. Copy lightragcoder.exe from dist directory to target machine")
+        print("1. Copy the entire LightRAGCoder/ directory from dist directory to target machine")
         print("2. Ensure target machine has code directories to analyze")
-        print("3. Run in command line: lightragcoder.exe --help for assistance")
+        print("3. Run in command line: LightRAGCoder/LightRAGCoder.exe --help for assistance")
         print("\nNotes:")
         print("- No need to install Python on target machine")
         print("- Program will generate symbol database files in working directory")
@@ -139,4 +269,4 @@ if __name__ == '__main__':
             sys.exit(1)
 
     # Execute build
-    build_exe()
\ No newline at end of file
+    build_exe(vendor='--vendor' in sys.argv[1:])
\ No newline at end of file
@@ -1,8 +1,7 @@
-import os
 import sys
 import argparse
 import argcomplete
-import asyncio
+import functools
 import logging
 from pathlib import Path
 
@@ -12,46 +11,50 @@ try:
 except ImportError:
     import tomli as tomllib
 
-# Import settings management
-import storage_setting
-
 # Add current directory to Python path
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
+# Frozen builds made with `build_exe.py --vendor` ship large packages as plain files
+vendor_dir = current_dir / "vendor"
+if getattr(sys, 'frozen', False) and vendor_dir.is_dir():
+    sys.path.insert(1, str(vendor_dir))
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Read version from pyproject.toml
+@functools.lru_cache(maxsize=1)
 def get_version():
-    """Get the version from pyproject.toml."""
-    try:
-        # Use os.path for better compatibility
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        pyproject_path = os.path.join(current_dir, "pyproject.toml")
+    """Get the version from pyproject.toml (or the build-time constant when frozen)."""
+    # Frozen builds embed the version at build time, no file I/O needed
+    if getattr(sys, 'frozen', False):
+        try:
+            from _version import __version__
+            return __version__
+        except ImportError:
+            pass
 
-        if not os.path.exists(pyproject_path):
+    try:
+        pyproject_path = Path(__file__).with_name("pyproject.toml")
+        if not pyproject_path.exists():
             return "unknown"
 
         # Simple parsing for version line
-        with open(pyproject_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.strip().startswith("version = "):
-                    return line.split("=")[-1].strip().strip('"')
-        return "unknown"
+        data = pyproject_path.read_text(encoding="utf-8")
+        version = data.partition('\nversion = ')[2].partition('\n')[0].strip().strip('"')
+        return version or "unknown"
     except Exception as e:
         logger.error(f"Failed to read version from pyproject.toml: {e}")
         return "unknown"
 
-def parse_args(args=None):
-    """Parse command line arguments.
-
-    Args:
-        args (list, optional): List of arguments to parse. If None, uses sys.argv[1:].
+@functools.lru_cache(maxsize=1)
+def _get_parser():
+    """Build the command line parser (built once and reused).
 
     Returns:
-        argparse.Namespace: Parsed arguments.
+        argparse.ArgumentParser: Configured parser.
     """
     parser = argparse.ArgumentParser(
         prog='LightRAGCoder',
@@ -96,12 +99,26 @@ def parse_args(args=None):
     subparsers.add_parser('version', help='Show program version')
 
     argcomplete.autocomplete(parser)
-    return parser.parse_args(args)
+    return parser
+
+def parse_args(args=None):
+    """Parse command line arguments.
+
+    Args:
+        args (list, optional): List of arguments to parse. If None, uses sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    return _get_parser().parse_args(args)
 
 def run_mcp(args):
     """Run the LightRAGCoder server."""
     logger.info("Running LightRAGCoder server (mcp)")
 
+    import storage_setting
+    from repo_graphrag.utils.storage_path import derive_storage_name
+
     # Set global variables for server.py
     import server
 
@@ -115,7 +132,7 @@ def run_mcp(args):
         server.read_dir_list = []
 
     server.storage_dir_path = args.storage_dir
-    server.storage_name = os.path.basename(server.storage_dir_path)
+    server.storage_name = derive_storage_name(server.storage_dir_path)
     logger.info(f"Storage directory: {server.storage_dir_path}")
 
     # Build storage description information
@@ -138,6 +155,10 @@ def run_build(args):
     """Create or update GraphRAG storage with settings management."""
     logger.info("Building GraphRAG storage")
 
+    import asyncio
+    import storage_setting
+    from repo_graphrag.utils.storage_path import derive_storage_name
+
     # 1. Read existing settings (if any)
     storage_dir = args.storage_dir
     settings = storage_setting.read_settings(storage_dir)
@@ -146,15 +167,7 @@ def run_build(args):
     # Get source paths list: from command line or existing settings
     if args.source:
         # Command line provides comma-separated string, convert to list
-        source_paths = []
-        for path_str in args.source.split(','):
-            path_str = path_str.strip()
-            if not path_str:
-                continue
-
-            # Use original path string, no normalization
-            source_paths.append(path_str)
-        source_dirs = source_paths
+        source_dirs = storage_setting.split_source_paths(args.source)
     else:
         # Get from settings
         source_dirs = storage_setting.get_source_dirs_from_settings(storage_dir)
@@ -177,20 +190,17 @@ def run_build(args):
         sys.exit(1)
 
     # 4. Check if settings need to be updated
-    settings_changed = False
     current_settings = {
         'source_dir': source_dirs,
         'description': description,
         'storage_dir': storage_dir,
-        'name': os.path.basename(storage_dir) if storage_dir else 'unnamed'
+        'name': derive_storage_name(storage_dir) if storage_dir else 'unnamed'
     }
 
-    for key, value in current_settings.items():
-        if settings.get(key) != value:
-            settings_changed = True
-            break
+    # Compare only the tracked keys in a single dict comparison
+    settings_changed = not settings or {key: settings.get(key) for key in current_settings} != current_settings
 
-    if settings_changed or not settings:
+    if settings_changed:
         # Update or create settings file
         if storage_setting.write_settings(storage_dir, current_settings):
             logger.info(f"Settings {'updated' if settings else 'created'}: {storage_dir}/settings.json")
@@ -211,6 +221,8 @@ def run_merge(args):
     """Merge entities in GraphRAG storage."""
     logger.info("Merging entities in GraphRAG storage")
 
+    import asyncio
+
     storage_dir = args.storage_dir
     logger.info(f"Storage directory: {storage_dir}")
 
@@ -230,6 +242,11 @@ def run_merge(args):
 
 def main():
     """Main entry point."""
+    # Fast path: version requests don't need argparse at all
+    if sys.argv[1:] in (['-v'], ['--version'], ['version']):
+        print(f"LightRAGCoder v{get_version()}")
+        return
+
     args = parse_args()
 
     # Handle version option and command
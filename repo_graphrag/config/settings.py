@@ -139,6 +139,13 @@ embedding_dim = get_config_value("EMBEDDING_DIM", "1024", int)
 embedding_support_custom_dim = get_config_value("EMBEDDING_SUPPORT_CUSTOM_DIM", "false", bool)
 embedding_max_token_size = get_config_value("EMBEDDING_MAX_TOKEN_SIZE", "2048", int)
 
+# Persist OpenAI embeddings in <storage_dir>/embed_cache.sqlite keyed by content hash
+embedding_cache_enabled = get_config_value("EMBEDDING_CACHE_ENABLED", "true", bool)
+
+# Reuse OpenAI embeddings of near-duplicate texts (trades correctness for hit rate; off by default)
+semantic_embed_cache_enabled = get_config_value("SEMANTIC_EMBED_CACHE", "false", bool)
+semantic_embed_cache_threshold = get_config_value("SEMANTIC_EMBED_CACHE_THRESHOLD", "0.98", float)
+
 if embedding_model_provider == "openai" and not (embedding_model_openai_api_key or embedding_model_openai_base_url):
     raise ValueError(f"Embedding model provider '{embedding_model_provider}' is selected but neither EMBEDDING_MODEL_OPENAI_API_KEY nor EMBEDDING_MODEL_OPENAI_BASE_URL is set.")
 
@@ -171,6 +178,9 @@ rate_limit_min_interval = get_config_value("RATE_LIMIT_MIN_INTERVAL", "1.0", flo
 # Wait time on rate-limit errors (sec)
 rate_limit_error_wait_time = get_config_value("RATE_LIMIT_ERROR_WAIT_TIME", "3.0", float)
 
+# Embedding API tokens-per-minute budget (0 = unlimited)
+embedding_tpm_limit = get_config_value("EMBEDDING_TPM_LIMIT", "0", int)
+
 # ==============================================================================
 # Planning/Query Settings
 # ==============================================================================
@@ -186,6 +196,17 @@ max_total_tokens = get_config_value("MAX_TOTAL_TOKENS", "30000", int)
 entity_max_tokens = get_config_value("MAX_ENTITY_TOKENS", "6000", int)
 relation_max_tokens = get_config_value("MAX_RELATION_TOKENS", "8000", int)
 
+# Response cache for planning/query (in-memory, cleared when the storage is updated)
+# Exact-match only unless semantic matching is enabled
+query_cache_enabled = get_config_value("QUERY_CACHE_ENABLED", "false", bool)
+query_cache_semantic_enabled = get_config_value("QUERY_CACHE_SEMANTIC_ENABLED", "false", bool)
+query_cache_similarity_threshold = get_config_value("QUERY_CACHE_SIMILARITY_THRESHOLD", "0.92", float)
+query_cache_ttl_seconds = get_config_value("QUERY_CACHE_TTL_SECONDS", "3600", float)
+query_cache_max_entries = get_config_value("QUERY_CACHE_MAX_ENTRIES", "256", int)
+
+# Lifetime of LightRAG's LLM response cache while serving planning/query (0 = drop after every request)
+llm_response_cache_ttl_seconds = get_config_value("LLM_RESPONSE_CACHE_TTL_SECONDS", "3600", float)
+
 # ==============================================================================
 # Document Extensions
 # ==============================================================================
@@ -460,6 +481,12 @@ code_ext_dict = {
 llm_model_max_async = parallel_num
 embedding_func_max_async = parallel_num
 
+# Max texts per OpenAI embedding API request (OpenAI caps a request at 2048 inputs)
+embedding_api_batch_size = get_config_value("EMBEDDING_API_BATCH_SIZE", "2048", int)
+
+# Max concurrent embedding API requests per openai_embed call
+embedding_api_max_concurrent = get_config_value("EMBEDDING_API_MAX_CONCURRENT", str(parallel_num), int)
+
 # ==============================================================================
 # Entity Merge Settings
 # ==============================================================================
@@ -1,12 +1,15 @@
 import gc
+import asyncio
 import logging
 import os
 import json
 from .initialization.initializer import initialize_rag
 from .config.settings import merge_enabled
+from typing import Awaitable, Callable, Optional
 from lightrag import LightRAG
 from lightrag.utils import compute_mdhash_id
-from .utils.file_reader import read_dir
+from .utils.storage_path import derive_storage_name
+from .utils.file_reader import read_dir, read_file_bytes
 from .utils.lock_manager import create_lock_file, remove_lock_file
 from .processors.document_processor import doc_to_storage
 from .processors.code_processor import code_to_storage
@@ -15,16 +18,24 @@ from .processors.entity_merger import merge_doc_and_code
 
 logger = logging.getLogger(__name__)
 
-async def create_graph_storage(read_dir_list: list, storage_dir_path: str):
+class StorageLockedError(RuntimeError):
+    """Raised when the storage lock is held by another update."""
+
+async def create_graph_storage(
+    read_dir_list: list,
+    storage_dir_path: str,
+    on_locked: Optional[Callable[[], Awaitable[None]]] = None
+):
     """
     Create or update GraphRAG storage.
 
     Args:
         read_dir_list: Target directory paths to read from
         storage_dir_path: Storage directory path
+        on_locked: Optional coroutine function awaited once the storage lock is held, before the update starts
     
     Raises:
-        RuntimeError: If a lock file already exists, indicating another process is updating the storage.
+        StorageLockedError: If a lock file already exists, indicating another process is updating the storage.
     """
     rag = None
     lock_created = False
@@ -32,24 +43,27 @@ async def create_graph_storage(read_dir_list: list, storage_dir_path: str):
         # Create lock file to prevent concurrent updates
         lock_created = create_lock_file(storage_dir_path)
         if not lock_created:
-            raise RuntimeError("GraphRAG storage is already being updated by another process. Please wait and try again later.")
+            raise StorageLockedError("GraphRAG storage is already being updated by another process. Please wait and try again later.")
+
+        if on_locked is not None:
+            await on_locked()
         
         # Initialize LightRAG
         rag = await initialize_rag(storage_dir_path)
 
         # Get workspace path
-        storage_name = os.path.basename(storage_dir_path.rstrip('/'))
+        storage_name = derive_storage_name(storage_dir_path)
         workspace_dir_path = os.path.join(storage_dir_path, storage_name + "_work")
 
         # Extract document and code files from the given directory
-        doc_dict, code_dict = read_dir(read_dir_list)
+        doc_dict, code_path_list = read_dir(read_dir_list)
 
         # If storage exists, delete stale/out-of-scope entries and identify files to process this run
-        current_process_doc_dict, current_process_code_dict = await _cleanup_and_prepare_documents(
+        current_process_doc_dict, current_process_code_path_list = await _cleanup_and_prepare_documents(
             rag,
             workspace_dir_path,
             doc_dict,
-            code_dict,
+            code_path_list,
             read_dir_list
         )
 
@@ -57,11 +71,11 @@ async def create_graph_storage(read_dir_list: list, storage_dir_path: str):
         await doc_to_storage(rag, current_process_doc_dict)
 
         # Chunk and graph code (only the files to be processed this run)
-        await code_to_storage(rag, current_process_code_dict)
+        await code_to_storage(rag, current_process_code_path_list)
 
         # Merge document and code entities (only when enabled by settings)
         if merge_enabled:
-            await merge_doc_and_code(rag, current_process_code_dict)
+            await merge_doc_and_code(rag, current_process_code_path_list)
         else:
             logger.info("MERGE_ENABLED=false, skipping entity merge")
     
@@ -89,9 +103,9 @@ async def _cleanup_and_prepare_documents(
     rag: LightRAG, 
     workspace_dir_path: str, 
     doc_dict: dict, 
-    code_dict: dict, 
+    code_path_list: list, 
     read_dir_list: list = []
-)-> tuple[dict, dict]:
+)-> tuple[dict, list]:
     """
     Delete stale/out-of-scope files from storage and determine the set of files to process in this run.
 
@@ -99,11 +113,11 @@ async def _cleanup_and_prepare_documents(
         rag: LightRAG instance
         workspace_dir_path: Workspace directory path
         doc_dict: Current document file dictionary
-        code_dict: Current code file dictionary
+        code_path_list: Current code file paths
         read_dir_list: Target directory paths to read from
 
     Returns:
-        tuple: (document_dict_to_process, code_dict_to_process)
+        tuple: (document_dict_to_process, code_path_list_to_process)
     """
     try:
         # Build path to kv_store_text_chunks.json
@@ -111,7 +125,7 @@ async def _cleanup_and_prepare_documents(
         
         # If the file doesn't exist, treat as a new storage; process all files
         if not os.path.exists(text_chunks_path):
-            return doc_dict, code_dict
+            return doc_dict, code_path_list
         
         # Load existing storage chunk metadata
         with open(text_chunks_path, "r", encoding="utf-8") as f:
@@ -125,9 +139,9 @@ async def _cleanup_and_prepare_documents(
             cleaned_content = doc_content.replace('\x00', '').strip() if doc_content else ""
             current_doc_dict[doc_file_path] = compute_mdhash_id(cleaned_content, prefix="doc-")
         
-        # Generate IDs for code files (no normalization)
-        for code_file_path, code_content_bytes in code_dict.items():
-            code_content = code_content_bytes.decode('utf-8')
+        # Generate IDs for code files (no normalization); read one file at a time off the event loop to bound memory
+        for code_file_path in code_path_list:
+            code_content = (await asyncio.to_thread(read_file_bytes, code_file_path)).decode('utf-8')
             current_doc_dict[code_file_path] = compute_mdhash_id(code_content, prefix="doc-")
         
         # Determine document IDs to delete and the set of files to process this run
@@ -156,11 +170,11 @@ async def _cleanup_and_prepare_documents(
         
         # Select files to process this run (exclude unchanged files)
         current_process_doc_dict = {k: v for k, v in doc_dict.items() if k not in unchanged_files}
-        current_process_code_dict = {k: v for k, v in code_dict.items() if k not in unchanged_files}
+        current_process_code_path_list = [k for k in code_path_list if k not in unchanged_files]
         
         logger.info("=" * 50)
         logger.info(f"Documents to process this run: {len(current_process_doc_dict)}")
-        logger.info(f"Code files to process this run: {len(current_process_code_dict)}")
+        logger.info(f"Code files to process this run: {len(current_process_code_path_list)}")
         
         # Execute deletions (out-of-scope + changed files)
         all_docs_to_delete = docs_to_delete | out_of_scope_docs
@@ -178,12 +192,11 @@ async def _cleanup_and_prepare_documents(
         else:
             logger.info("No documents to delete")
         
-        logger.info("=" * 50)
-        logger.info("")
+        logger.info("=" * 50 + "\n")
         
-        return current_process_doc_dict, current_process_code_dict
+        return current_process_doc_dict, current_process_code_path_list
             
     except Exception as e:
         logger.error(f"Error during document cleanup: {e}")
         # On error, process all files
-        return doc_dict, code_dict
+        return doc_dict, code_path_list
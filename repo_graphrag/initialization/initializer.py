@@ -1,6 +1,10 @@
-import gc
 import os
+import shutil
 import asyncio
+import logging
+import tempfile
+import functools
+from typing import TYPE_CHECKING
 from ..config.settings import (
     parallel_num,
     graph_create_max_token_size,
@@ -9,6 +13,9 @@ from ..config.settings import (
     embedding_tokenizer_model_name,
     embedding_dim,
     embedding_max_token_size,
+    embedding_cache_enabled,
+    semantic_embed_cache_enabled,
+    semantic_embed_cache_threshold,
     llm_model_max_async,
     embedding_func_max_async,
     document_definition_list,
@@ -17,17 +24,23 @@ from ..config.settings import (
     hf_hub_cache
 )
 from lightrag import LightRAG
-from transformers import AutoModel, AutoTokenizer
+from ..utils.storage_path import derive_storage_name
 from lightrag.utils import EmbeddingFunc
-from lightrag.llm.hf import hf_embed
 from lightrag.kg.shared_storage import initialize_pipeline_status
 from ..llm.llm_client import complete_graph_create
 from ..llm.openai_embedding import openai_embed
+from ..llm.embed_cache import get_embedding_cache, get_semantic_embedding_cache
 
+if TYPE_CHECKING:
+    from transformers import AutoTokenizer
+
+
+logger = logging.getLogger(__name__)
 
 _emb_model = None
 _tokenizer = None
 _embed_init_lock = None
+_embedding_func = None
 
 async def _load_embedding_components():
     """
@@ -40,33 +53,31 @@ async def _load_embedding_components():
     global _emb_model, _tokenizer, _embed_init_lock, _embedding_func
 
     # Check if we already have an embedding function
-    if hasattr(_load_embedding_components, '_cached_embedding_func'):
-        return _load_embedding_components._cached_embedding_func
-
-    # Share the same lock across calls
-    lock = _embed_init_lock
-    if lock is None:
-        new_lock = asyncio.Lock()
-        if _embed_init_lock is None:
-            _embed_init_lock = new_lock
-            lock = new_lock
-        else:
-            lock = _embed_init_lock
+    if _embedding_func is not None:
+        return _embedding_func
 
-    async with lock:
+    # Create the shared lock once (no await in between, so this cannot race on the event loop)
+    if _embed_init_lock is None:
+        _embed_init_lock = asyncio.Lock()
+
+    async with _embed_init_lock:
         # Double-check after acquiring lock
-        if hasattr(_load_embedding_components, '_cached_embedding_func'):
-            return _load_embedding_components._cached_embedding_func
+        if _embedding_func is not None:
+            return _embedding_func
+
+        # Import transformers lazily so importing this package stays lightweight
+        from transformers import AutoModel, AutoTokenizer
 
         # Load embedding model based on provider
         if embedding_model_provider == "huggingface":
-            # Load HuggingFace embedding model & tokenizer
-            if huggingface_hub_token:
-                _emb_model = await asyncio.to_thread(AutoModel.from_pretrained, embedding_model_name, token=huggingface_hub_token)
-                _tokenizer = await asyncio.to_thread(AutoTokenizer.from_pretrained, embedding_tokenizer_model_name, token=huggingface_hub_token)
-            else:
-                _emb_model = await asyncio.to_thread(AutoModel.from_pretrained, embedding_model_name)
-                _tokenizer = await asyncio.to_thread(AutoTokenizer.from_pretrained, embedding_tokenizer_model_name)
+            from lightrag.llm.hf import hf_embed
+
+            # Load HuggingFace embedding model & tokenizer concurrently
+            hf_kwargs = {"token": huggingface_hub_token} if huggingface_hub_token else {}
+            _emb_model, _tokenizer = await asyncio.gather(
+                asyncio.to_thread(AutoModel.from_pretrained, embedding_model_name, **hf_kwargs),
+                asyncio.to_thread(AutoTokenizer.from_pretrained, embedding_tokenizer_model_name, **hf_kwargs)
+            )
 
             # Create HuggingFace embedding function
             def hf_embedding_func(texts):
@@ -76,29 +87,59 @@ async def _load_embedding_components():
                     embed_model=_emb_model,
                 )
 
-            _load_embedding_components._cached_embedding_func = hf_embedding_func
+            _embedding_func = hf_embedding_func
 
         elif embedding_model_provider == "openai":
             # For OpenAI provider, we don't need to load local models
             # Set them to None to indicate we're using OpenAI API
             _emb_model = None
-            if not hf_hub_offline:
-                _tokenizer = await asyncio.to_thread(AutoTokenizer.from_pretrained, embedding_tokenizer_model_name)
-                _tokenizer.save_pretrained(hf_hub_cache + "/" + embedding_tokenizer_model_name)
+            tokenizer_cache_dir = os.path.join(hf_hub_cache, embedding_tokenizer_model_name)
+            # tokenizer_config.json marks a complete save (an interrupted save never reaches the final directory)
+            if hf_hub_offline or os.path.isfile(os.path.join(tokenizer_cache_dir, "tokenizer_config.json")):
+                # Load from the local cache, no download or re-save needed
+                _tokenizer = await asyncio.to_thread(AutoTokenizer.from_pretrained, tokenizer_cache_dir)
             else:
-                _tokenizer = await asyncio.to_thread(AutoTokenizer.from_pretrained, hf_hub_cache + "/" + embedding_tokenizer_model_name)
+                _tokenizer = await asyncio.to_thread(AutoTokenizer.from_pretrained, embedding_tokenizer_model_name)
+                await asyncio.to_thread(_save_tokenizer_atomically, _tokenizer, tokenizer_cache_dir)
 
 
             # Import OpenAI embedding function
 
             # Use OpenAI embedding function directly
-            _load_embedding_components._cached_embedding_func = openai_embed
+            _embedding_func = openai_embed
 
         else:
             raise ValueError(f"Unsupported embedding model provider: {embedding_model_provider}. "
                            f"Supported providers: 'huggingface', 'openai'")
 
-        return _load_embedding_components._cached_embedding_func
+        return _embedding_func
+
+
+def _save_tokenizer_atomically(tokenizer, target_dir: str) -> None:
+    """
+    Save a tokenizer with save_pretrained into a temporary directory, then rename it into place,
+    so an interrupted save never leaves a partial cache at target_dir.
+
+    Args:
+        tokenizer: Tokenizer to save
+        target_dir: Final cache directory
+    """
+    parent_dir = os.path.dirname(target_dir)
+    os.makedirs(parent_dir, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix=".tokenizer-", dir=parent_dir)
+    try:
+        tokenizer.save_pretrained(temp_dir)
+        # Replace a partial cache left by an interrupted save (only inside the HF cache, never a user path)
+        cache_root = os.path.abspath(hf_hub_cache)
+        if os.path.isdir(target_dir) and os.path.commonpath([os.path.abspath(target_dir), cache_root]) == cache_root:
+            shutil.rmtree(target_dir)
+        os.rename(temp_dir, target_dir)
+    except OSError as e:
+        # Another process may have saved the cache first; the loaded tokenizer is still usable
+        logger.warning(f"Failed to cache tokenizer at {target_dir}: {e}")
+    finally:
+        if os.path.isdir(temp_dir):
+            shutil.rmtree(temp_dir, ignore_errors=True)
 
 
 async def initialize_rag(storage_dir_path: str) -> LightRAG:
@@ -112,15 +153,24 @@ async def initialize_rag(storage_dir_path: str) -> LightRAG:
         LightRAG: The initialized LightRAG instance
     """
     
-    # Attempt to clean up global state
-    gc.collect()
-    
     # Derive storage name from path
-    storage_name = os.path.basename(storage_dir_path.rstrip('/'))
+    storage_name = derive_storage_name(storage_dir_path)
     
     # Get embedding function from provider-specific initialization
     embedding_func_raw = await _load_embedding_components()
 
+    # Bind the per-storage persistent caches to the OpenAI embedding function
+    if embedding_func_raw is openai_embed:
+        cache_kwargs = {}
+        if embedding_cache_enabled:
+            cache_kwargs["cache"] = get_embedding_cache(storage_dir_path, embedding_model_name, embedding_dim)
+        if semantic_embed_cache_enabled:
+            cache_kwargs["semantic_cache"] = get_semantic_embedding_cache(
+                storage_dir_path, embedding_model_name, embedding_dim, semantic_embed_cache_threshold
+            )
+        if cache_kwargs:
+            embedding_func_raw = functools.partial(openai_embed, **cache_kwargs)
+
     # Wrap the embedding function in EmbeddingFunc
     embedding_func = EmbeddingFunc(
         embedding_dim=embedding_dim,
@@ -151,7 +201,7 @@ async def initialize_rag(storage_dir_path: str) -> LightRAG:
 
     return rag
 
-def get_tokenizer() -> AutoTokenizer:
+def get_tokenizer() -> "AutoTokenizer":
     """
     Get the tokenizer used by the embedding model.
     Only available for HuggingFace provider.
@@ -0,0 +1,320 @@
+import os
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+EMBED_CACHE_FILE_NAME = "embed_cache.sqlite"
+SEMANTIC_EMBED_CACHE_FILE_NAME = "semantic_embed_cache.sqlite"
+
+# Dimension of the hashed character-trigram sketch used for near-duplicate lookup
+SKETCH_DIM = 384
+
+# SQLite limits the number of bound parameters per statement
+_SQLITE_MAX_PARAMS = 500
+
+class EmbeddingCache:
+    """Persistent embedding cache keyed by a hash of model name, dimension and text."""
+
+    def __init__(self, db_path: str, model_name: str, dim: int) -> None:
+        """
+        Args:
+            db_path: Path to the SQLite database file
+            model_name: Embedding model name (part of the cache key)
+            dim: Embedding dimension (part of the cache key)
+        """
+        self.db_path = db_path
+        self.key_prefix = f"{model_name}:{dim}:"
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self.conn.commit()
+
+    def make_key(self, text: str) -> str:
+        """Build the cache key for a text."""
+        return hashlib.blake2b((self.key_prefix + text).encode("utf-8"), digest_size=16).hexdigest()
+
+    def _get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        result = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self.lock:
+            for i in range(0, len(unique_keys), _SQLITE_MAX_PARAMS):
+                chunk = unique_keys[i:i + _SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, vector in rows:
+                    result[key] = np.frombuffer(vector, dtype=np.float32)
+        return result
+
+    def _set_many(self, items: List[Tuple[str, bytes]]) -> None:
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", items)
+            self.conn.commit()
+
+    async def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up cached vectors.
+
+        Args:
+            keys: Cache keys from make_key
+
+        Returns:
+            Mapping of key -> vector for the keys found in the cache
+        """
+        if not keys:
+            return {}
+        return await asyncio.to_thread(self._get_many, keys)
+
+    async def set_many(self, items: Iterable[Tuple[str, Iterable[float]]]) -> None:
+        """
+        Store vectors in the cache.
+
+        Args:
+            items: Pairs of (key, vector)
+        """
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+        if rows:
+            await asyncio.to_thread(self._set_many, rows)
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self.lock:
+            self.conn.close()
+
+_caches: Dict[str, EmbeddingCache] = {}
+
+def get_embedding_cache(storage_dir: str, model_name: str, dim: int) -> EmbeddingCache:
+    """
+    Get the embedding cache for a storage directory (one instance per directory).
+
+    Args:
+        storage_dir: Storage directory path
+        model_name: Embedding model name
+        dim: Embedding dimension
+
+    Returns:
+        EmbeddingCache: Cache stored at <storage_dir>/embed_cache.sqlite
+    """
+    db_path = os.path.abspath(os.path.join(storage_dir, EMBED_CACHE_FILE_NAME))
+    cache = _caches.get(db_path)
+    if cache is None:
+        cache = _caches[db_path] = EmbeddingCache(db_path, model_name, dim)
+        logger.info(f"Embedding cache: {db_path}")
+    return cache
+
+def text_sketch(text: str) -> np.ndarray:
+    """
+    Build a cheap local representation of a text: hashed character-trigram counts, L2-normalized.
+
+    The similarity of two sketches measures textual overlap, not meaning, so it is the wrong measure for
+    code equivalence: a one-token edit that changes behavior (`<` to `<=`, a changed constant) scores
+    close to 1, while a meaning-preserving rename or re-indent scores much lower (see test_text_sketch).
+
+    Args:
+        text: Text to sketch
+
+    Returns:
+        np.ndarray: float32 vector of length SKETCH_DIM (all zeros for texts shorter than 3 bytes)
+    """
+    data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8).astype(np.uint32)
+    if data.size < 3:
+        return np.zeros(SKETCH_DIM, dtype=np.float32)
+
+    # Pack each byte trigram into one integer and hash it into a bucket (multiplicative hashing)
+    trigrams = (data[:-2] << np.uint32(16)) | (data[1:-1] << np.uint32(8)) | data[2:]
+    buckets = ((trigrams * np.uint32(2654435761)) >> np.uint32(15)) % SKETCH_DIM
+    sketch = np.bincount(buckets, minlength=SKETCH_DIM).astype(np.float32)
+    sketch /= np.linalg.norm(sketch)
+    return sketch
+
+class SemanticEmbeddingCache:
+    """
+    Near-duplicate embedding cache: reuses the stored vector of the most similar previously embedded text.
+
+    Texts are compared by their trigram sketches (brute-force cosine similarity held in memory);
+    a stored vector is reused when the similarity reaches the threshold. This trades correctness for hit rate:
+    a small edit that changes behavior reuses the stale vector of the text before the edit, and
+    meaning-preserving variants (renames, reformatting) are not matched. Off by default (SEMANTIC_EMBED_CACHE).
+    """
+
+    def __init__(self, db_path: str, model_name: str, dim: int, threshold: float) -> None:
+        """
+        Args:
+            db_path: Path to the SQLite database file
+            model_name: Embedding model name (entries are kept per model and dimension)
+            dim: Embedding dimension
+            threshold: Minimum cosine similarity between sketches to reuse a vector
+        """
+        self.db_path = db_path
+        self.model_key = f"{model_name}:{dim}"
+        self.dim = dim
+        self.threshold = threshold
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS semantic_embeddings "
+            "(id INTEGER PRIMARY KEY, model_key TEXT NOT NULL, sketch BLOB NOT NULL, vector BLOB NOT NULL)"
+        )
+        self.conn.commit()
+
+        # Load stored entries for this model into memory for similarity search
+        rows = self.conn.execute(
+            "SELECT sketch, vector FROM semantic_embeddings WHERE model_key = ? ORDER BY id", (self.model_key,)
+        ).fetchall()
+        # Rows live in preallocated buffers that grow geometrically, so appending a batch is amortized O(batch)
+        self.size = len(rows)
+        self._sketch_buffer = np.empty((max(self.size, 1024), SKETCH_DIM), dtype=np.float32)
+        self._vector_buffer = np.empty((max(self.size, 1024), dim), dtype=np.float32)
+        for i, (sketch, vector) in enumerate(rows):
+            self._sketch_buffer[i] = np.frombuffer(sketch, dtype=np.float32)
+            self._vector_buffer[i] = np.frombuffer(vector, dtype=np.float32)
+
+    @property
+    def sketches(self) -> np.ndarray:
+        """Stored sketches, shape (size, SKETCH_DIM)."""
+        return self._sketch_buffer[:self.size]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Stored embedding vectors, shape (size, dim)."""
+        return self._vector_buffer[:self.size]
+
+    def _append(self, sketches: np.ndarray, vectors: np.ndarray) -> None:
+        new_size = self.size + len(sketches)
+        if new_size > len(self._sketch_buffer):
+            capacity = max(new_size, 2 * len(self._sketch_buffer))
+            self._sketch_buffer = np.concatenate([self.sketches, np.empty((capacity - self.size, SKETCH_DIM), dtype=np.float32)])
+            self._vector_buffer = np.concatenate([self.vectors, np.empty((capacity - self.size, self.dim), dtype=np.float32)])
+        self._sketch_buffer[self.size:new_size] = sketches
+        self._vector_buffer[self.size:new_size] = vectors
+        self.size = new_size
+
+    def _lookup(self, texts: List[str]) -> Tuple[np.ndarray, Dict[int, np.ndarray]]:
+        sketches = np.stack([text_sketch(text) for text in texts])
+        hits = {}
+        with self.lock:
+            if len(self.sketches):
+                similarity = sketches @ self.sketches.T
+                best = similarity.argmax(axis=1)
+                for pos in np.flatnonzero(similarity[np.arange(len(texts)), best] >= self.threshold):
+                    hits[int(pos)] = self.vectors[best[pos]]
+        return sketches, hits
+
+    def _add_many(self, sketches: np.ndarray, vectors: np.ndarray) -> None:
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO semantic_embeddings (model_key, sketch, vector) VALUES (?, ?, ?)",
+                [(self.model_key, sketch.tobytes(), vector.tobytes()) for sketch, vector in zip(sketches, vectors)]
+            )
+            self.conn.commit()
+            self._append(sketches, vectors)
+
+    async def lookup(self, texts: List[str]) -> Tuple[np.ndarray, Dict[int, np.ndarray]]:
+        """
+        Find stored vectors for near-duplicates of the given texts.
+
+        Args:
+            texts: Texts to look up
+
+        Returns:
+            tuple: (sketches of all texts, mapping of text position -> reused vector for the hits)
+        """
+        return await asyncio.to_thread(self._lookup, texts)
+
+    async def add_many(self, sketches: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Store newly embedded vectors with their sketches.
+
+        Args:
+            sketches: Sketches from lookup, shape (n, SKETCH_DIM)
+            vectors: Embedding vectors, shape (n, dim)
+        """
+        if len(sketches):
+            await asyncio.to_thread(
+                self._add_many, np.asarray(sketches, dtype=np.float32), np.asarray(vectors, dtype=np.float32)
+            )
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self.lock:
+            self.conn.close()
+
+_semantic_caches: Dict[str, SemanticEmbeddingCache] = {}
+
+def get_semantic_embedding_cache(storage_dir: str, model_name: str, dim: int, threshold: float) -> SemanticEmbeddingCache:
+    """
+    Get the near-duplicate embedding cache for a storage directory (one instance per directory).
+
+    Args:
+        storage_dir: Storage directory path
+        model_name: Embedding model name
+        dim: Embedding dimension
+        threshold: Minimum sketch cosine similarity to reuse a vector
+
+    Returns:
+        SemanticEmbeddingCache: Cache stored at <storage_dir>/semantic_embed_cache.sqlite
+    """
+    db_path = os.path.abspath(os.path.join(storage_dir, SEMANTIC_EMBED_CACHE_FILE_NAME))
+    cache = _semantic_caches.get(db_path)
+    if cache is None:
+        cache = _semantic_caches[db_path] = SemanticEmbeddingCache(db_path, model_name, dim, threshold)
+        logger.info(f"Semantic embedding cache: {db_path} (threshold: {threshold})")
+    return cache
+
+
+def test_text_sketch(threshold: float = 0.98):
+    """
+    Show which edits text_sketch treats as near-duplicates at the given threshold
+    (default: SEMANTIC_EMBED_CACHE_THRESHOLD's default).
+    """
+    base = (
+        "def compute_total(items, tax_rate):\n"
+        "    total = 0\n"
+        "    for item in items:\n"
+        "        if item.quantity < 100:\n"
+        "            continue\n"
+        "        total += item.price * item.quantity\n"
+        "    return total * (1 + tax_rate)\n"
+    )
+    # (edit, variant, expected to reuse the cached vector)
+    cases = [
+        # Behavior-changing edits that still reuse the stale vector
+        ("comparison swap (< to <=)", base.replace("< 100", "<= 100"), True),
+        ("changed constant (100 to 1000)", base.replace("< 100", "< 1000"), True),
+        ("operator swap (+ to -)", base.replace("1 +", "1 -"), True),
+        ("added comment line", base.replace("    return", "    # apply tax\n    return"), True),
+        # Meaning-preserving variants that are not matched
+        ("renamed loop variable", base.replace("item", "entry"), False),
+        ("consistent rename", base.replace("total", "subtotal").replace("item", "entry"), False),
+        ("re-indent (spaces to tabs)", base.replace("    ", "\t"), False),
+        ("unrelated code", "class Foo:\n    def bar(self):\n        return self.x\n", False),
+    ]
+
+    print("=" * 60)
+    print(f"Testing text_sketch near-duplicate detection (threshold: {threshold})")
+    print("=" * 60)
+
+    base_sketch = text_sketch(base)
+    for edit, variant, expected_hit in cases:
+        similarity = float(base_sketch @ text_sketch(variant))
+        hit = similarity >= threshold
+        print(f"   [{'HIT' if hit else 'MISS'}] {edit}: similarity {similarity:.4f}")
+        assert hit == expected_hit, f"{edit}: expected {'hit' if expected_hit else 'miss'}, got similarity {similarity:.4f}"
+
+    print("[SUCCESS] Sketches match small textual edits (including behavior changes), not renames or reformatting")
+
+
+if __name__ == "__main__":
+    test_text_sketch()
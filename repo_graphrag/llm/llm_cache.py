@@ -0,0 +1,132 @@
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class _CacheEntry:
+    namespace: str
+    embedding: Optional[np.ndarray]
+    response: Any
+    created_at: float
+
+class SemanticCache:
+    """
+    In-memory response cache for planning/query results.
+
+    A request hits the cache when its exact text was seen before. With semantic matching enabled, a request
+    also hits when the cosine similarity between its embedding and a cached request's embedding (same namespace)
+    reaches the threshold. Entries expire after ttl_seconds and the least recently used entries are evicted
+    beyond max_entries.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int, semantic: bool = False) -> None:
+        """
+        Args:
+            threshold: Minimum cosine similarity for a semantic hit
+            ttl_seconds: Entry lifetime in seconds (0 = no expiry)
+            max_entries: Maximum number of cached responses
+            semantic: Also match semantically similar requests (needs an embedding per request)
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.semantic = semantic
+        self.entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> str:
+        """Build the exact-match key for a request."""
+        return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _evict_expired(self) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        expire_before = time.monotonic() - self.ttl_seconds
+        for key in [key for key, entry in self.entries.items() if entry.created_at < expire_before]:
+            del self.entries[key]
+
+    def _hit(self, key: str, entry: _CacheEntry) -> Any:
+        self.hits += 1
+        self.entries.move_to_end(key)
+        logger.info(f"Response cache: {self.hits} hits, {self.misses} misses")
+        return entry.response
+
+    def get(self, namespace: str, text: str) -> Optional[Any]:
+        """
+        Look up a cached response for exactly the same request.
+
+        Args:
+            namespace: Request kind (e.g. tool name and prompt template)
+            text: Request text
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        self._evict_expired()
+
+        key = self.make_key(namespace, text)
+        entry = self.entries.get(key)
+        if entry is None:
+            # Semantic lookups count their own miss
+            if not self.semantic:
+                self.misses += 1
+            return None
+        return self._hit(key, entry)
+
+    def get_similar(self, namespace: str, embedding) -> Optional[Any]:
+        """
+        Look up the cached response of the most similar request (call after an exact miss).
+
+        Args:
+            namespace: Request kind (e.g. tool name and prompt template)
+            embedding: Embedding of the request text
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        candidates = [(k, e) for k, e in self.entries.items() if e.namespace == namespace and e.embedding is not None]
+        if candidates:
+            similarity = np.stack([e.embedding for _, e in candidates]) @ self._normalize(embedding)
+            best = int(similarity.argmax())
+            if similarity[best] >= self.threshold:
+                logger.info(f"Semantic cache hit (similarity: {similarity[best]:.4f})")
+                return self._hit(*candidates[best])
+
+        self.misses += 1
+        return None
+
+    def put(self, namespace: str, text: str, response: Any, embedding=None) -> None:
+        """
+        Store a response.
+
+        Args:
+            namespace: Request kind (e.g. tool name and prompt template)
+            text: Request text
+            response: Response to cache
+            embedding: Embedding of the request text (only used for semantic matching)
+        """
+        key = self.make_key(namespace, text)
+        vector = self._normalize(embedding) if embedding is not None else None
+        self.entries[key] = _CacheEntry(namespace, vector, response, time.monotonic())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached responses (e.g. after the storage has been updated)."""
+        self.entries.clear()
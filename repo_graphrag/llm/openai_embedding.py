@@ -4,22 +4,53 @@ from ..config.settings import (
     embedding_model_name,
     rate_limit_error_wait_time,
     embedding_dim,
-    embedding_support_custom_dim
+    embedding_support_custom_dim,
+    embedding_api_batch_size,
+    embedding_api_max_concurrent
 )
 from ..utils.rate_limiter import get_rate_limiter
-from typing import List
-from openai import AsyncOpenAI
+from .embed_cache import EmbeddingCache, SemanticEmbeddingCache
+from typing import Awaitable, Dict, List, Optional
+from openai import AsyncOpenAI, APIConnectionError, BadRequestError, InternalServerError, RateLimitError
 import asyncio
+import base64
+import os
+import importlib.util
 import logging
+import random
+import httpx
 import numpy as np
 
 
 logger = logging.getLogger(__name__)
 
+# Max texts per embedding API request
+EMBED_BATCH_SIZE = max(1, embedding_api_batch_size)
+
+# Max concurrent embedding API requests per openai_embed call
+MAX_CONCURRENT_BATCHES = max(1, embedding_api_max_concurrent)
+
+# Retries for transient embedding API errors, and the cap on a single backoff (seconds)
+EMBED_MAX_RETRIES = 5
+EMBED_MAX_BACKOFF = 60.0
+
+# Max pooled (keep-alive) connections shared by concurrent embedding requests
+EMBED_HTTP_MAX_CONNECTIONS = 64
+
 # Initialize OpenAI client for embeddings
 _openai_embedding_client = None
 if embedding_model_openai_api_key or embedding_model_openai_base_url:
-    client_kwargs = {"timeout": 300.0}
+    # Share one keep-alive connection pool across batches; multiplex over HTTP/2 when h2 is installed
+    _embedding_http_client = httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        timeout=300.0,
+        limits=httpx.Limits(
+            max_connections=EMBED_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=EMBED_HTTP_MAX_CONNECTIONS
+        )
+    )
+    # Retries are handled in _create_embeddings (max_retries=0 avoids stacking SDK retries on top)
+    client_kwargs = {"timeout": 300.0, "max_retries": 0, "http_client": _embedding_http_client}
     if embedding_model_openai_api_key:
         client_kwargs["api_key"] = embedding_model_openai_api_key
 
@@ -27,19 +58,160 @@ if embedding_model_openai_api_key or embedding_model_openai_base_url:
         client_kwargs["base_url"] = embedding_model_openai_base_url.rstrip("/")
     _openai_embedding_client = AsyncOpenAI(**client_kwargs)
 
-async def openai_embed(texts: List[str]) -> np.ndarray:
+def _build_embed_params(batch: List[str]) -> dict:
+    """
+    Build embedding request parameters for a batch of texts.
+
+    Args:
+        batch: Texts to embed in one API request
+
+    Returns:
+        dict: Keyword arguments for embeddings.create
+    """
+    embed_params = {
+        "model": embedding_model_name,
+        "input": batch,
+        # base64 float32 blobs are ~4x smaller than JSON float arrays and skip float parsing
+        "encoding_format": "base64"
+    }
+
+    # Only include dimensions if the model supports custom dimensions
+    if embedding_support_custom_dim:
+        embed_params["dimensions"] = embedding_dim
+
+    return embed_params
+
+def _estimate_tokens(batch: List[str]) -> int:
+    """Cheap token estimate for rate limiting (~4 characters per token)."""
+    return sum(len(text) // 4 + 1 for text in batch)
+
+def _decode_embedding(embedding) -> np.ndarray:
+    """
+    Decode an embedding returned by the API.
+
+    Args:
+        embedding: base64 string of little-endian float32 values, or a list of floats
+            (some OpenAI-compatible servers ignore encoding_format)
+
+    Returns:
+        np.ndarray: float32 vector
+    """
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype="<f4")
+    return np.asarray(embedding, dtype=np.float32)
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the Retry-After header (in seconds) from an API error, if present."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+async def _create_embeddings(batch: List[str]) -> List[np.ndarray]:
+    """
+    Call the embeddings API for one batch, retrying transient errors.
+
+    Rate-limit, timeout/connection and 5xx errors are retried up to EMBED_MAX_RETRIES
+    times, honoring Retry-After when given, otherwise with exponential backoff and jitter.
+
+    Args:
+        batch: Texts to embed in one API request
+
+    Returns:
+        List of embedding vectors in input order
+    """
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        try:
+            # Apply rate limiting for API calls
+            async with get_rate_limiter(tokens=_estimate_tokens(batch)):
+                response = await _openai_embedding_client.embeddings.create(**_build_embed_params(batch))
+            return [_decode_embedding(data.embedding) for data in response.data]
+
+        except (RateLimitError, APIConnectionError, InternalServerError) as e:
+            if attempt == EMBED_MAX_RETRIES:
+                raise
+            wait_time = _retry_after_seconds(e)
+            if wait_time is None:
+                wait_time = min(EMBED_MAX_BACKOFF, rate_limit_error_wait_time * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            logger.warning(f"OpenAI embedding API error ({type(e).__name__}), retry {attempt + 1}/{EMBED_MAX_RETRIES} in {wait_time:.2f} seconds: {e}")
+            await asyncio.sleep(wait_time)
+
+async def _gather_or_cancel(*aws: Awaitable) -> list:
+    """
+    Run awaitables concurrently and return their results in order.
+    On the first failure the remaining ones are cancelled and the error is raised.
+    """
+    # asyncio.wait rejects an empty set (e.g. every text was a cache hit)
+    if not aws:
+        return []
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+        return [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def _embed_batch(batch: List[str]) -> List[np.ndarray]:
+    """
+    Embed one batch of texts; if the API rejects its input, split it in half and retry both halves concurrently.
+
+    Only BadRequestError (an input-specific rejection, e.g. a text over the token limit) is bisected.
+    Other errors (authentication, permissions, rate limits after retries) are raised immediately
+    since every smaller request would fail the same way.
+
+    Args:
+        batch: Texts to embed in one API request
+
+    Returns:
+        List of embedding vectors in input order
+    """
+    try:
+        return await _create_embeddings(batch)
+
+    except BadRequestError as e:
+        logger.error(f"OpenAI embedding API rejected a batch of {len(batch)} texts: {e}")
+
+        # Bisect to isolate the rejected text(s); a failing half cancels the other
+        if len(batch) > 1:
+            mid = len(batch) // 2
+            left, right = await _gather_or_cancel(_embed_batch(batch[:mid]), _embed_batch(batch[mid:]))
+            return left + right
+        else:
+            raise RuntimeError(f"Failed to embed text: {batch[0][:50]}... Error: {e}") from e
+
+async def openai_embed(
+    texts: List[str],
+    cache: Optional[EmbeddingCache] = None,
+    semantic_cache: Optional[SemanticEmbeddingCache] = None
+) -> np.ndarray:
     """
     Generate embeddings using OpenAI API.
 
+    Texts are split into batches of EMBED_BATCH_SIZE that are sent concurrently
+    (at most MAX_CONCURRENT_BATCHES at a time); results keep the input order.
+    Identical texts are embedded once and the vector is copied to every duplicate.
+    When a cache is given, only texts missing from it are sent to the API.
+    When a semantic cache is given, near-duplicates of previously embedded texts reuse the stored vector.
+
     Args:
         texts: List of text strings to embed
+        cache: Optional persistent embedding cache
+        semantic_cache: Optional near-duplicate embedding cache
 
     Returns:
-        np.ndarray: Array of embeddings
+        np.ndarray: float32 array of shape (len(texts), embedding_dim)
 
     Raises:
         ValueError: If OpenAI client is not configured
-        RuntimeError: If embedding generation fails
+        RuntimeError: If embedding generation fails or the dimension doesn't match EMBEDDING_DIM
     """
     if not _openai_embedding_client:
         raise ValueError(
@@ -47,55 +219,74 @@ async def openai_embed(texts: List[str]) -> np.ndarray:
             "Please set either EMBEDDING_MODEL_OPENAI_API_KEY or EMBEDDING_MODEL_OPENAI_BASE_URL."
         )
 
-    # Prepare batches if needed (OpenAI has token limits)
-    all_embeddings = []
-
-    try:
-        # Apply rate limiting for API calls
-        async with get_rate_limiter():
-            # Create embedding request parameters
-            embed_params = {
-                "model": embedding_model_name,
-                "input": texts,
-                "encoding_format": "float"
-            }
-            
-            # Only include dimensions if the model supports custom dimensions
-            if embedding_support_custom_dim:
-                embed_params["dimensions"] = embedding_dim
-            
-            response = await _openai_embedding_client.embeddings.create(**embed_params)
-
-        all_embeddings = [data.embedding for data in response.data]
-
-    except Exception as e:
-        logger.error(f"OpenAI embedding API error: {e}")
-
-        # If batch fails, try individual texts
-        if len(texts) > 1:
-            for text in texts:
-                try:
-                    async with get_rate_limiter():
-                        # Create embedding request parameters for fallback
-                        embed_params = {
-                            "model": embedding_model_name,
-                            "input": [text],
-                            "encoding_format": "float"
-                        }
-                        
-                        # Only include dimensions if the model supports custom dimensions
-                        if embedding_support_custom_dim:
-                            embed_params["dimensions"] = embedding_dim
-                        
-                        response = await _openai_embedding_client.embeddings.create(**embed_params)
-                    all_embeddings.append(response.data[0].embedding)
-                except Exception as inner_e:
-                    logger.error(f"Failed to embed individual text: {inner_e}")
-                    raise RuntimeError(f"Failed to embed text: {text[:50]}... Error: {inner_e}")
+    # Preallocate the output so each batch is copied straight into its rows
+    out = np.empty((len(texts), embedding_dim), dtype=np.float32)
+
+    # Serve cache hits first, only embed the misses
+    miss_idx = list(range(len(texts)))
+    if cache is not None:
+        keys = [cache.make_key(text) for text in texts]
+        cached = await cache.get_many(keys)
+        miss_idx = []
+        for i, key in enumerate(keys):
+            if key in cached:
+                out[i] = cached[key]
+            else:
+                miss_idx.append(i)
+
+    # Embed each distinct text once (repos often repeat snippets such as license headers)
+    first_row: Dict[str, int] = {}
+    unique_idx = []
+    duplicate_rows = []
+    duplicate_sources = []
+    for i in miss_idx:
+        source_row = first_row.setdefault(texts[i], i)
+        if source_row == i:
+            unique_idx.append(i)
         else:
-            raise RuntimeError(f"Failed to embed text: {texts[0][:50]}... Error: {e}")
-
-    return np.array(all_embeddings)
+            duplicate_rows.append(i)
+            duplicate_sources.append(source_row)
+
+    # Reuse vectors of near-duplicate texts, only embed the rest
+    api_idx = unique_idx
+    if semantic_cache is not None and unique_idx:
+        sketches, semantic_hits = await semantic_cache.lookup([texts[i] for i in unique_idx])
+        for pos, vector in semantic_hits.items():
+            out[unique_idx[pos]] = vector
+        api_pos = [pos for pos in range(len(unique_idx)) if pos not in semantic_hits]
+        api_idx = [unique_idx[pos] for pos in api_pos]
+        if semantic_hits:
+            logger.info(f"Semantic embedding cache: reused {len(semantic_hits)}/{len(unique_idx)} vectors")
+
+    # Split into batches of row indices (OpenAI has per-request input limits)
+    batches = [api_idx[i:i + EMBED_BATCH_SIZE] for i in range(0, len(api_idx), EMBED_BATCH_SIZE)]
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+
+    async def _run_batch(rows: List[int]) -> None:
+        async with semaphore:
+            batch_vecs = await _embed_batch([texts[i] for i in rows])
+        batch_array = np.stack(batch_vecs)
+        if batch_array.shape[1:] != (embedding_dim,):
+            raise RuntimeError(
+                f"Embedding dimension mismatch: expected {embedding_dim}, got {batch_array.shape[1:]}. "
+                "Please check EMBEDDING_DIM."
+            )
+        out[rows] = batch_array
+
+    await _gather_or_cancel(*[_run_batch(rows) for rows in batches])
+
+    # Fan vectors out to duplicate texts
+    if duplicate_rows:
+        out[duplicate_rows] = out[duplicate_sources]
+
+    # Only vectors returned by the API are cached (not approximate semantic hits)
+    if cache is not None and api_idx:
+        await cache.set_many((keys[i], out[i]) for i in api_idx)
+
+    if semantic_cache is not None and api_idx:
+        await semantic_cache.add_many(sketches[api_pos], out[api_idx])
+
+    return out
 
 
 async def test_openai_embedding():
@@ -171,6 +362,45 @@ async def test_openai_embedding():
         print(f"   [AVG] Average similarity: {np.mean(similarity_matrix):.4f}")
         print()
 
+        # Test calls that need no API request (empty input, all cache hits)
+        print("4. Testing cache-only calls...")
+        import tempfile
+        global _create_embeddings
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = EmbeddingCache(os.path.join(cache_dir, "embed_cache.sqlite"), embedding_model_name, embedding_dim)
+            # Threshold -1 makes every lookup a hit once anything is stored
+            semantic_cache = SemanticEmbeddingCache(
+                os.path.join(cache_dir, "semantic_embed_cache.sqlite"), embedding_model_name, embedding_dim, threshold=-1.0
+            )
+            cached_embeddings = await openai_embed(test_texts, cache=cache)
+            await openai_embed(test_texts[:1], semantic_cache=semantic_cache)
+
+            # Any API request from here on is a failure
+            create_embeddings = _create_embeddings
+
+            async def _no_api_request(batch):
+                raise AssertionError(f"Unexpected API request for {len(batch)} texts")
+
+            _create_embeddings = _no_api_request
+            try:
+                empty = await openai_embed([], cache=cache)
+                assert empty.shape == (0, embedding_dim)
+                print(f"   [OK] Empty input: shape {empty.shape}")
+
+                exact_hits = await openai_embed(test_texts[:2], cache=cache)
+                assert np.allclose(exact_hits, cached_embeddings[:2])
+                print(f"   [OK] All exact cache hits: shape {exact_hits.shape}")
+
+                semantic_hits = await openai_embed(test_texts[1:], semantic_cache=semantic_cache)
+                assert semantic_hits.shape == (len(test_texts) - 1, embedding_dim)
+                print(f"   [OK] All semantic cache hits: shape {semantic_hits.shape}")
+            finally:
+                _create_embeddings = create_embeddings
+                cache.close()
+                semantic_cache.close()
+        print()
+
         print("=" * 60)
         print("[SUCCESS] All tests completed successfully!")
         print("=" * 60)
@@ -36,6 +36,9 @@ async def create_code_graph(
     relationships = []
     
     file_name = os.path.basename(code_path)
+
+    # Entity name prefix shared by all entities of this file
+    entity_prefix = file_name + ":"
     
     # Initialize queue with tuples (node, parent-name, depth)
     task_queue = asyncio.Queue()
@@ -57,7 +60,8 @@ async def create_code_graph(
         definition_name = parent_definition_name
 
         # If node type is in definition list, generate an entity
-        if current_node.type in definition_dict:
+        name_node_type = definition_dict.get(current_node.type)
+        if name_node_type is not None:
             start_line, end_line = get_node_line_range(current_node, line_offset_list)
 
             # Prepare queue for searching child nodes
@@ -70,9 +74,9 @@ async def create_code_graph(
             # Find the child node that carries the definition name
             while not search_queue.empty():
                 search_node = await search_queue.get()
-                if search_node.type == definition_dict[current_node.type]:
+                if search_node.type == name_node_type:
                     definition_name = file_content_bytes[search_node.start_byte:search_node.end_byte].decode('utf-8').strip()
-                    entity_name = f"{file_name}:{definition_name}"
+                    entity_name = entity_prefix + definition_name
                     break
                 else:
                     for child in search_node.children:
@@ -99,9 +103,10 @@ async def create_code_graph(
                 )
 
                 # Create parent-child relationship
-                if parent_definition_name and f"{file_name}:{parent_definition_name}" != entity_name:
+                parent_entity_name = entity_prefix + parent_definition_name
+                if parent_definition_name and parent_entity_name != entity_name:
                     relationships.append({
-                        "src_id": f"{file_name}:{parent_definition_name}",
+                        "src_id": parent_entity_name,
                         "tgt_id": entity_name,
                         "description": f"The {definition_name} of {parent_definition_name} located in lines {start_line} through {end_line}.",
                         "keywords": f"{parent_definition_name} {definition_name}",
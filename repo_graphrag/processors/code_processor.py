@@ -1,20 +1,63 @@
 import os
 import logging
 import asyncio
+import threading
 from datetime import datetime, timezone
-from typing import Dict, Any, Tuple
+from typing import TYPE_CHECKING, Dict, Any, Iterable, List, Tuple
 from ..config.settings import code_ext_dict, parallel_num
 from tree_sitter import Parser
-from lightrag import LightRAG
 from lightrag.utils import compute_mdhash_id
 from lightrag.base import DocStatus
 from .code_chunker import create_code_chunks
 from .code_grapher import create_code_graph
 from ..utils.node_line_range import get_node_line_range, build_line_offset_list
+from ..utils.file_reader import read_file_bytes
+
+# Only needed for type hints
+if TYPE_CHECKING:
+    from tree_sitter import Tree
+    from lightrag import LightRAG
 
 
 logger = logging.getLogger(__name__)
 
+# Tree-sitter parsers reused across files, keyed by extension (without dot).
+# Parsing runs in worker threads and a Parser must not be used by two threads at once,
+# so each thread keeps its own cache.
+_parser_local = threading.local()
+
+def _get_parser(ext_key: str) -> Parser:
+    """
+    Get the current thread's cached Tree-sitter parser for a file extension, creating it on first use.
+
+    Args:
+        ext_key: File extension without the leading dot
+
+    Returns:
+        Parser: Parser configured for the extension's language
+    """
+    parser_cache: Dict[str, Parser] = getattr(_parser_local, "parser_cache", None)
+    if parser_cache is None:
+        parser_cache = _parser_local.parser_cache = {}
+    parser = parser_cache.get(ext_key)
+    if parser is None:
+        parser = parser_cache[ext_key] = Parser(code_ext_dict[ext_key]["language"])
+    return parser
+
+def _parse_sync(ext_key: str, file_content_bytes: bytes) -> Tuple["Tree", List[int]]:
+    """
+    Parse file bytes and build the line offset list (CPU-bound, runs in a worker thread).
+
+    Args:
+        ext_key: File extension without the leading dot
+        file_content_bytes: File content as bytes
+
+    Returns:
+        tuple: (syntax tree, line offset list)
+    """
+    tree = _get_parser(ext_key).parse(file_content_bytes)
+    return tree, build_line_offset_list(file_content_bytes)
+
 async def process_file(code_path: str, file_content_bytes: bytes) -> Dict[str, Any]:
     """
     Process a single code file: chunking and graph extraction.
@@ -30,23 +73,14 @@ async def process_file(code_path: str, file_content_bytes: bytes) -> Dict[str, A
 
     # Extract extension from filename
     _, ext = os.path.splitext(file_name)
+    ext_key = ext.lstrip(".")
 
-    # Prepare Tree-sitter parser
-    language = code_ext_dict[ext.lstrip(".")]["language"]
-    parser = Parser(language)
-
-    # Parse bytes into syntax tree
-    tree = parser.parse(file_content_bytes)
+    # Parse bytes into syntax tree and build a line offset list off the event loop
+    tree, line_offset_list = await asyncio.to_thread(_parse_sync, ext_key, file_content_bytes)
 
     # Get root node
     root_node = tree.root_node
 
-    # Decode bytes to UTF-8 text
-    file_content_text = file_content_bytes.decode('utf-8')
-
-    # Build a line offset list
-    line_offset_list = build_line_offset_list(file_content_bytes)
-
     chunks = []
     entities = []
     relationships = []
@@ -55,7 +89,10 @@ async def process_file(code_path: str, file_content_bytes: bytes) -> Dict[str, A
     chunk_node_list = await create_code_chunks(root_node, file_content_bytes)
 
     # Get definition node types to extract as entities
-    definition_dict = code_ext_dict[ext.lstrip(".")]["definition"]
+    definition_dict = code_ext_dict[ext_key]["definition"]
+
+    # Chunk ID prefix shared by all chunks of this file
+    source_prefix = f"file:{file_name}_line:"
 
     # For each target node, perform chunking and graph extraction
     for node, node_text in chunk_node_list:
@@ -64,7 +101,7 @@ async def process_file(code_path: str, file_content_bytes: bytes) -> Dict[str, A
         start_line, end_line = get_node_line_range(node, line_offset_list)
 
         # Set chunk ID
-        source_id = f"file:{file_name}_line:{start_line}-{end_line}"
+        source_id = source_prefix + str(start_line) + "-" + str(end_line)
 
         # Append chunk with its ID
         chunks.append(
@@ -95,13 +132,17 @@ async def process_file(code_path: str, file_content_bytes: bytes) -> Dict[str, A
     # Return file/chunks/graph information
     return {
         "file_path": code_path,
-        "file_content": file_content_text,
+        "file_content_bytes": file_content_bytes,
         "chunks": chunks,
         "entities": entities,
         "relationships": relationships
     }
 
-async def store_file_result(rag: LightRAG, result: Dict[str, Any]) -> None:
+def _compute_chunk_ids(chunks: List[Dict[str, Any]]) -> List[str]:
+    """Compute LightRAG chunk IDs for a file's chunks."""
+    return [compute_mdhash_id(chunk["content"], prefix="chunk-") for chunk in chunks]
+
+async def store_file_result(rag: "LightRAG", result: Dict[str, Any]) -> None:
     """
     Store a single file's processing results into storage.
     This function runs serially to avoid database resource conflicts.
@@ -111,13 +152,15 @@ async def store_file_result(rag: LightRAG, result: Dict[str, Any]) -> None:
         result: File processing results from process_file
     """
     file_path = result["file_path"]
-    file_content = result["file_content"]
     file_chunks = result["chunks"]
     file_entities = result["entities"]
     file_relationships = result["relationships"]
 
     if file_chunks or file_entities or file_relationships:
         try:
+            # Decode bytes to UTF-8 text only when there is something to store
+            file_content = result["file_content_bytes"].decode('utf-8')
+
             # Create document ID from file content
             doc_id = compute_mdhash_id(file_content, prefix="doc-")
 
@@ -133,8 +176,8 @@ async def store_file_result(rag: LightRAG, result: Dict[str, Any]) -> None:
 
             # Update document status
             if file_chunks:
-                # Build list of chunk IDs
-                chunk_ids = [compute_mdhash_id(chunk["content"], prefix="chunk-") for chunk in file_chunks]
+                # Build list of chunk IDs in a worker thread (storage is serial, keep the event loop free)
+                chunk_ids = await asyncio.to_thread(_compute_chunk_ids, file_chunks)
 
                 # Upsert document status
                 current_time = datetime.now(timezone.utc).isoformat()
@@ -170,274 +213,68 @@ async def store_file_result(rag: LightRAG, result: Dict[str, Any]) -> None:
             logger.error(f"code_processor error for {file_path}: {e}")
             raise
 
-async def code_to_storage(rag: LightRAG, code_dict: Dict[str, bytes]) -> None:
+async def code_to_storage(rag: "LightRAG", code_paths: Iterable[str]) -> None:
     """
     Chunk code, build a graph, and store into backend storage.
-    Uses dynamic batch queue processing with serial storage operations.
+    Files are read, processed and stored up to parallel_num at a time; storage itself runs serially.
+    A file keeps its slot until its results are stored, so at most parallel_num files
+    (content, chunks and graph elements) are held in memory.
 
     Args:
         rag: LightRAG instance
-        code_dict: Mapping of file path -> file content bytes
+        code_paths: Code file paths
     """
+    code_paths = list(code_paths)
+
     logger.info("=" * 50)
     logger.info("Graphing code files")
-    logger.info(f"Starting code processing: {len(code_dict)} files")
-
-    # Create queues for processing pipeline
-    processing_queue = asyncio.Queue()
-    storage_queue = asyncio.Queue()
+    logger.info(f"Starting code processing: {len(code_paths)} files")
 
     # Track processing progress
-    total_files = len(code_dict)
-    processed_count = 0
+    total_files = len(code_paths)
     stored_count = 0
 
-    # Event to signal completion
-    processing_done = asyncio.Event()
-    storage_done = asyncio.Event()
-    # Event to signal cancellation due to storage failure
-    cancelled_event = asyncio.Event()
-
-    async def producer() -> None:
-        """Producer coroutine: put all files into processing queue."""
-        logger.info(f"Producer: Adding {total_files} files to processing queue")
-        for code_path, file_content_bytes in code_dict.items():
-            await processing_queue.put((code_path, file_content_bytes))
-        logger.info("Producer: All files added to queue")
-        # Signal that no more items will be added
-        for _ in range(parallel_num):
-            await processing_queue.put(None)  # Sentinel value to stop workers
-
-    async def processing_worker(worker_id: int) -> None:
-        """Worker coroutine: process files from queue and put results into storage queue."""
-        nonlocal processed_count
-        logger.info(f"Worker {worker_id}: Started")
-
-        while True:
-            try:
-                # Get next file to process
-                item = await processing_queue.get()
-
-                # Check for sentinel value (end of processing)
-                if item is None:
-                    processing_queue.task_done()
-                    break
-
-                code_path, file_content_bytes = item
-
-                try:
-                    # Process the file
-                    logger.info(f"Worker {worker_id}: Processing {code_path}")
-                    result = await process_file(code_path, file_content_bytes)
-
-                    # Put result into storage queue
-                    await storage_queue.put(result)
-
-                    # Update progress
-                    processed_count += 1
-                    logger.info(f"Worker {worker_id}: Processed {code_path} ({processed_count}/{total_files})")
-
-                except Exception as e:
-                    logger.error(f"Worker {worker_id}: Error processing {code_path}: {e}")
-                    # Re-raise to stop processing on critical errors
-                    raise
-                finally:
-                    processing_queue.task_done()
-
-            except asyncio.CancelledError:
-                logger.info(f"Worker {worker_id}: Cancelled")
-                break
-            except Exception as e:
-                logger.error(f"Worker {worker_id}: Unexpected error: {e}")
-                break
-
-        logger.info(f"Worker {worker_id}: Finished")
-        # Check if all workers are done
-        if processed_count == total_files:
-            processing_done.set()
-
-    async def storage_worker() -> None:
-        """Storage worker coroutine: process results from storage queue serially."""
+    # Bound the number of files held at once, and store one file at a time (avoids database resource conflicts)
+    semaphore = asyncio.Semaphore(parallel_num)
+    storage_lock = asyncio.Lock()
+
+    async def process_and_store(code_path: str) -> None:
         nonlocal stored_count
-        logger.info("Storage worker: Started")
+        async with semaphore:
+            # Read just in time so disk I/O overlaps with processing of other files
+            file_content_bytes = await asyncio.to_thread(read_file_bytes, code_path)
+            result = await process_file(code_path, file_content_bytes)
 
-        try:
-            while True:
-                # Get next result to store
-                result = await storage_queue.get()
-
-                # Check for sentinel value (end of processing)
-                if result is None:
-                    storage_queue.task_done()
-                    break
-
-                try:
-                    # Store the result
-                    await store_file_result(rag, result)
-
-                    # Update progress
-                    stored_count += 1
-                    logger.info(f"Storage worker: Stored {result['file_path']} ({stored_count}/{total_files})")
-
-                except Exception as e:
-                    logger.error(f"Storage worker: Error storing {result['file_path']}: {e}")
-                    # Re-raise to stop processing on critical errors
-                    raise e
-                finally:
-                    storage_queue.task_done()
-
-            # Only set storage_done when exiting normally
-            logger.info("Storage worker: Finished normally")
-            storage_done.set()
-            
-        except asyncio.CancelledError:
-            logger.info("Storage worker: Cancelled")
-            # Set storage_done when cancelled
-            storage_done.set()
-        except Exception as e:
-            logger.error(f"Storage worker: Unexpected error: {e}")
-            # Do NOT set storage_done on unexpected errors
-            # This ensures progress_reporter can detect the failure
-            raise e
+            async with storage_lock:
+                await store_file_result(rag, result)
 
-    # Start the processing pipeline
-    logger.info(f"Starting processing pipeline with {parallel_num} workers")
+                # Update progress
+                stored_count += 1
+                logger.info(f"Stored {code_path} ({stored_count}/{total_files})")
+
+    logger.info(f"Starting processing with {parallel_num} parallel workers")
     start_time = datetime.now(timezone.utc)
 
-    # Create tasks
-    producer_task = asyncio.create_task(producer())
-    worker_tasks = [asyncio.create_task(processing_worker(i)) for i in range(parallel_num)]
-    storage_task = asyncio.create_task(storage_worker())
-
-    # Progress reporting task
-    async def progress_reporter() -> None:
-        """Periodically report processing progress and check for storage task failures."""
-        while not processing_done.is_set() or not storage_done.is_set():
-            await asyncio.sleep(20)  # Report every 20 seconds
-            
-            # Check if storage task has completed with an exception
-            if storage_task.done():
-                storage_exception = storage_task.exception()
-                if storage_exception is not None:
-                    logger.error(f"Storage task failed with exception: {storage_exception}")
-                    logger.error(f"Progress at error: {processed_count}/{total_files} processed, {stored_count}/{total_files} stored")
-
-                    # Set cancellation event to signal all workers to stop
-                    cancelled_event.set()
-                    
-                    # Cancel all tasks except progress reporter itself
-                    # (It will be terminated when we raise the exception)
-                    for task in worker_tasks:
-                        task.cancel()
-                    producer_task.cancel()
-                    
-                    logger.error("Cancelling all tasks due to storage task failure")
-                    # Re-raise the storage exception
-                    raise storage_exception
-            
-            if not processing_done.is_set():
-                logger.info(f"Progress: {processed_count}/{total_files} files processed")
-            if not storage_done.is_set():
-                logger.info(f"Progress: {stored_count}/{total_files} files stored")
-        logger.info("Progress reporter: Finished")
-
-    progress_task = asyncio.create_task(progress_reporter())
+    tasks = [asyncio.create_task(process_and_store(code_path)) for code_path in code_paths]
 
     try:
-        # Wait for processing to complete OR cancellation due to storage failure
-        # Use wait() to wait for either processing_done or cancelled_event
-        done, pending = await asyncio.wait(
-            [asyncio.create_task(processing_done.wait()), asyncio.create_task(cancelled_event.wait())],
-            return_when=asyncio.FIRST_COMPLETED
-        )
-
-        # Check which event completed first
-        if cancelled_event.is_set():
-            logger.error("Cancellation detected while waiting for processing to complete")
-            # Storage has failed, raise an exception to exit
-            raise RuntimeError("Processing cancelled due to storage failure")
-
-        # Otherwise, processing completed normally
-        processing_time = datetime.now(timezone.utc)
-        logger.info(f"All files processed ({processed_count}/{total_files}) in {(processing_time - start_time).total_seconds():.2f} seconds")
-
-        # Signal storage worker to stop (if not already stopped by failure)
-        if not cancelled_event.is_set():
-            await storage_queue.put(None)
-
-            # Wait for storage to complete
-            await storage_done.wait()
-            storage_time = datetime.now(timezone.utc)
-            logger.info(f"All files stored ({stored_count}/{total_files}) in {(storage_time - processing_time).total_seconds():.2f} seconds")
-
-            # Calculate total time
-            total_time = datetime.now(timezone.utc)
-            logger.info(f"Total processing time: {(total_time - start_time).total_seconds():.2f} seconds")
+        # Surface the first error as soon as any file fails
+        for next_done in asyncio.as_completed(tasks):
+            await next_done
 
     except Exception as e:
         logger.error(f"Processing pipeline error: {e}")
-        logger.error(f"Progress at error: {processed_count}/{total_files} processed, {stored_count}/{total_files} stored")
-
-        # Cancel all tasks
-        progress_task.cancel()
-        for task in worker_tasks:
-            task.cancel()
-        storage_task.cancel()
-        producer_task.cancel()
-
-        # Log task cancellation status
-        logger.error("Cancelling all tasks due to error")
+        logger.error(f"Progress at error: {stored_count}/{total_files} stored")
         raise
 
     finally:
-        # Cancel progress reporter
-        progress_task.cancel()
-        for task in worker_tasks:
+        # Cancel files still pending after an error
+        for task in tasks:
             task.cancel()
-        storage_task.cancel()
-        producer_task.cancel()
-
-        # Wait for all tasks to complete
-        results = await asyncio.gather(
-            *worker_tasks,
-            storage_task,
-            producer_task,
-            progress_task,
-            return_exceptions=True
-        )
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-        # Check for exceptions in tasks
-        critical_exception = None
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                # Ignore CancelledError - these are expected when tasks are cancelled
-                if isinstance(result, asyncio.CancelledError):
-                    continue
-
-                if i < len(worker_tasks):
-                    logger.warning(f"Worker {i} raised exception: {result}")
-                elif i == len(worker_tasks):
-                    # Storage worker exception is critical - should cause process to fail
-                    logger.error(f"Storage worker raised critical exception: {result}")
-                    if critical_exception is None:
-                        critical_exception = result
-                elif i == len(worker_tasks) + 1:
-                    logger.warning(f"Producer raised exception: {result}")
-                else:
-                    # Progress reporter exception is critical (it re-raises storage exceptions)
-                    logger.error(f"Progress reporter raised critical exception: {result}")
-                    if critical_exception is None:
-                        critical_exception = result
-
-    # If we have a critical exception (storage failure), re-raise it
-    if critical_exception is not None:
-        logger.error(f"Re-raising critical exception from processing: {critical_exception}")
-        raise critical_exception
-
-    # Verify completion
-    if processed_count == total_files and stored_count == total_files:
-        logger.info("✓ All code processing completed successfully")
-    else:
-        logger.warning(f"⚠ Processing incomplete: {processed_count}/{total_files} processed, {stored_count}/{total_files} stored")
+    total_time = datetime.now(timezone.utc)
+    logger.info(f"Total processing time: {(total_time - start_time).total_seconds():.2f} seconds")
+    logger.info("✓ All code processing completed successfully")
 
     logger.info("=" * 50 + "\n")
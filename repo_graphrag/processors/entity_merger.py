@@ -4,7 +4,7 @@ import re
 import fnmatch
 import numpy as np
 import faiss
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 from ..config.settings import (
     parallel_num,
     merge_score_threshold,
@@ -144,16 +144,16 @@ async def _batch_embedding(embedding_func, texts: List[str], batch_size: int = e
     logger.info(f"Embedding complete: processed {len(all_embeddings)} embeddings")
     return all_embeddings
 
-async def merge_doc_and_code(rag: LightRAG, current_code_dict: Optional[Dict[str, Any]] = None) -> None:
+async def merge_doc_and_code(rag: LightRAG, current_code_paths: Optional[Iterable[str]] = None) -> None:
     """
     Merge entities between documents and code based on name similarity.
 
     Args:
         rag: LightRAG instance
-        current_code_dict: Mapping of currently processed code files
+        current_code_paths: Currently processed code file paths
     """
     # Build set of current code file paths (if provided)
-    current_code_file_paths = set(current_code_dict.keys()) if current_code_dict else set()
+    current_code_file_paths = set(current_code_paths) if current_code_paths else set()
 
     # Retrieve all entity names from storage
     all_entity_name = await rag.get_graph_labels()
@@ -5,3 +5,6 @@ from .lock_manager import (
     check_lock_file_exists,
     LOCK_FILE_NAME
 )
+
+# Storage path utilities
+from .storage_path import derive_storage_name
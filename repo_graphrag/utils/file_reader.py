@@ -1,6 +1,6 @@
 import os
 import logging
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 from ..config.settings import (
     doc_ext_dict, 
     code_ext_dict, 
@@ -10,7 +10,7 @@ from ..config.settings import (
 
 logger = logging.getLogger(__name__)
 
-def read_dir(read_dir_list: list) -> Tuple[Dict[str, str], Dict[str, bytes]]:
+def read_dir(read_dir_list: list) -> Tuple[Dict[str, str], List[str]]:
     """
     Traverse directories or process individual files.
 
@@ -18,16 +18,16 @@ def read_dir(read_dir_list: list) -> Tuple[Dict[str, str], Dict[str, bytes]]:
         read_dir_list: List of target directory paths or file paths to read
 
     Returns:
-        tuple: (doc_dict, code_dict) - Dictionaries for document files and code files
+        tuple: (doc_dict, code_path_list) - Document files and code file paths
         - doc_dict: file_path → text content
-        - code_dict: file_path → bytes content
+        - code_path_list: code file paths (content is read later, one file at a time)
     """
     logger.info("=" * 50)
     logger.info("Planned files to process")
     logger.info(f"Exclude list: {no_process_file_list}")
 
     doc_dict = {}
-    code_dict = {}
+    code_path_list = []
 
     # Build the set of allowed extensions (documents + code)
     allow_ext_set = set(doc_ext_dict["text_file"]) | set(code_ext_dict.keys())
@@ -61,8 +61,7 @@ def read_dir(read_dir_list: list) -> Tuple[Dict[str, str], Dict[str, bytes]]:
 
             # Read file content into dictionaries
             if ext_without_dot in code_ext_dict:
-                with open(file_path, "rb") as file:
-                    code_dict[file_path] = file.read()
+                code_path_list.append(file_path)
                 logger.info(f"Code file: {file_path}")
             elif ext_without_dot in doc_ext_dict["text_file"] or is_special_file:
                 try:
@@ -110,8 +109,7 @@ def read_dir(read_dir_list: list) -> Tuple[Dict[str, str], Dict[str, bytes]]:
 
                     # Read file content into dictionaries
                     if ext_without_dot in code_ext_dict:
-                        with open(file_path, "rb") as file:
-                            code_dict[file_path] = file.read()
+                        code_path_list.append(file_path)
                         logger.info(f"Code file: {file_path}")
                     elif ext_without_dot in doc_ext_dict["text_file"] or is_special_file:
                         try:
@@ -136,4 +134,9 @@ def read_dir(read_dir_list: list) -> Tuple[Dict[str, str], Dict[str, bytes]]:
 
     logger.info("=" * 50 + "\n")
 
-    return doc_dict, code_dict
+    return doc_dict, code_path_list
+
+def read_file_bytes(file_path: str) -> bytes:
+    """Read a file's content as bytes (blocking; call via asyncio.to_thread from async code)."""
+    with open(file_path, "rb") as file:
+        return file.read()
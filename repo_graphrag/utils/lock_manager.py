@@ -1,4 +1,5 @@
 import os
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,17 +18,19 @@ def create_lock_file(storage_dir: str) -> bool:
     """
     try:
         lock_file_path = os.path.join(storage_dir, LOCK_FILE_NAME)
+        timestamp = time.time()
         
-        # Check if lock file already exists
-        if os.path.exists(lock_file_path):
+        # Create the lock file atomically (fails if it already exists, so no check-then-create race)
+        try:
+            fd = os.open(lock_file_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
             logger.warning(f"Lock file already exists: {lock_file_path}")
             return False
         
-        # Create the lock file
-        with open(lock_file_path, 'w') as f:
+        with os.fdopen(fd, 'w') as f:
             # Write process ID to lock file for debugging
             f.write(f"Process ID: {os.getpid()}\n")
-            f.write(f"Timestamp: {os.path.getctime(lock_file_path)}\n")
+            f.write(f"Timestamp: {timestamp}\n")
         
         logger.info(f"Lock file created: {lock_file_path}")
         return True
@@ -48,13 +51,12 @@ def remove_lock_file(storage_dir: str) -> bool:
     try:
         lock_file_path = os.path.join(storage_dir, LOCK_FILE_NAME)
         
-        # Check if lock file exists
-        if not os.path.exists(lock_file_path):
+        # Remove the lock file
+        try:
+            os.unlink(lock_file_path)
+        except FileNotFoundError:
             logger.warning(f"Lock file not found: {lock_file_path}")
             return False
-        
-        # Remove the lock file
-        os.remove(lock_file_path)
         logger.info(f"Lock file removed: {lock_file_path}")
         return True
     except Exception as e:
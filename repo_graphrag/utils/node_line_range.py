@@ -1,6 +1,7 @@
 import bisect
 import logging
 from typing import List, Tuple
+import numpy as np
 from tree_sitter import Node
 
 logger = logging.getLogger(__name__)
@@ -14,12 +15,16 @@ def build_line_offset_list(file_content_bytes: bytes) -> List[int]:
     Returns:
         List[int]: Byte offsets
     """
-    offsets: List[int] = [0]
-    for i, b in enumerate(file_content_bytes):
-        if b == 0x0A:
-            if i + 1 < len(file_content_bytes):
-                offsets.append(i + 1)
-    return offsets
+    # Find newlines in one vectorized pass; each line starts right after a newline
+    content_array = np.frombuffer(file_content_bytes, dtype=np.uint8)
+    offsets = np.flatnonzero(content_array == 0x0A) + 1
+
+    # A trailing newline at EOF does not start a new line
+    if offsets.size and offsets[-1] == len(file_content_bytes):
+        offsets = offsets[:-1]
+
+    # Plain list: bisect on a list is faster than np.searchsorted for per-node scalar lookups
+    return [0] + offsets.tolist()
 
 
 def get_node_line_range(node: Node, line_offset_list: List[int]) -> Tuple[int, int]:
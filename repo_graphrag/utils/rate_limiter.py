@@ -1,25 +1,72 @@
 import asyncio
 import time
 import logging
-from ..config.settings import rate_limit_min_interval, llm_model_max_async
+from typing import Optional
+from ..config.settings import rate_limit_min_interval, llm_model_max_async, embedding_tpm_limit
 
 
 logger = logging.getLogger(__name__)
 
+class TokenBucket:
+    """Shared tokens-per-minute budget, refilled continuously."""
+
+    def __init__(self, tokens_per_minute: int) -> None:
+        """
+        Args:
+            tokens_per_minute: Token budget per minute
+        """
+        self.capacity = tokens_per_minute
+        self.available = float(tokens_per_minute)
+        self.refill_rate = tokens_per_minute / 60.0
+        self.last_refill_time = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until the budget has room for the given number of tokens, then debit it."""
+        # A single request larger than the whole budget only waits for a full bucket
+        tokens = min(tokens, self.capacity)
+
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.last_refill_time) * self.refill_rate)
+                self.last_refill_time = now
+
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return
+
+                wait_time = (tokens - self.available) / self.refill_rate
+                logger.info(f"Token rate limit: waiting {wait_time:.2f} seconds for {tokens} tokens...")
+                await asyncio.sleep(wait_time)
+
+# Process-wide embedding TPM budget (None when unlimited)
+_embedding_token_bucket = TokenBucket(embedding_tpm_limit) if embedding_tpm_limit > 0 else None
+
 class RateLimiter:
-    """Controls API request intervals and concurrency."""
+    """Controls API request intervals, concurrency and (optionally) token throughput."""
     
-    def __init__(self, min_interval: float = 1.0, max_concurrent: int = 3) -> None:
+    def __init__(
+        self,
+        min_interval: float = 1.0,
+        max_concurrent: int = 3,
+        token_bucket: Optional[TokenBucket] = None,
+        tokens: int = 0
+    ) -> None:
         """
         Args:
             min_interval: Minimum interval between requests in seconds
             max_concurrent: Maximum concurrent operations
+            token_bucket: Shared token budget to debit, if any
+            tokens: Estimated tokens consumed by this request
         """
         self.min_interval = min_interval
         self.max_concurrent = max_concurrent
         self.last_request_time = 0
         self.request_lock = asyncio.Lock()
         self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.token_bucket = token_bucket
+        self.tokens = tokens
         
     async def __aenter__(self) -> 'RateLimiter':
         """Enter async context: enforce concurrency and pacing."""
@@ -37,6 +84,10 @@ class RateLimiter:
                 await asyncio.sleep(wait_time)
             
             self.last_request_time = time.time()
+
+        # Wait for token budget
+        if self.token_bucket is not None and self.tokens > 0:
+            await self.token_bucket.acquire(self.tokens)
         
         return self
     
@@ -44,11 +95,15 @@ class RateLimiter:
         """Exit async context: release concurrency slot."""
         self.semaphore.release()
 
-def get_rate_limiter() -> RateLimiter:
+def get_rate_limiter(tokens: int = 0) -> RateLimiter:
     """
     Create a new RateLimiter instance from settings.
 
+    Args:
+        tokens: Estimated embedding tokens of the request; debited from the shared
+            EMBEDDING_TPM_LIMIT budget when one is configured
+
     Returns:
         RateLimiter: Instance initialized with configured values
     """
-    return RateLimiter(rate_limit_min_interval, llm_model_max_async)
+    return RateLimiter(rate_limit_min_interval, llm_model_max_async, _embedding_token_bucket, tokens)
@@ -0,0 +1,14 @@
+import os
+
+
+def derive_storage_name(storage_dir: str) -> str:
+    """
+    Derive the storage name from the storage directory path.
+
+    Args:
+        storage_dir: Storage directory path (trailing separators are ignored)
+
+    Returns:
+        Last path component of the storage directory
+    """
+    return os.path.basename(os.path.normpath(storage_dir))
@@ -1,19 +1,35 @@
 import os
 import gc
+import time
+import hashlib
+import queue
+import atexit
+import asyncio
 import logging
 import storage_setting
-from logging.handlers import RotatingFileHandler
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from repo_graphrag.config.settings import (
     search_top_k,
     search_mode,
     max_total_tokens,
     entity_max_tokens,
     relation_max_tokens,
+    query_cache_enabled,
+    query_cache_semantic_enabled,
+    query_cache_similarity_threshold,
+    query_cache_ttl_seconds,
+    query_cache_max_entries,
+    llm_response_cache_ttl_seconds,
 )
 from mcp.server.fastmcp import FastMCP
 from lightrag import QueryParam
+from lightrag.prompt import PROMPTS
 from repo_graphrag.initialization.initializer import initialize_rag
-from repo_graphrag.graph_storage_creator import create_graph_storage
+from repo_graphrag.llm.llm_cache import SemanticCache
+from repo_graphrag.graph_storage_creator import create_graph_storage, StorageLockedError
+from repo_graphrag.utils.storage_path import derive_storage_name
 from repo_graphrag.utils.lock_manager import create_lock_file, remove_lock_file, check_lock_file_exists
 from repo_graphrag.prompts import (
     PLAN_PROMPT_TEMPLATE,
@@ -25,6 +41,10 @@ from repo_graphrag.prompts import (
     GRAPH_STORAGE_UPDATE_PROCESSING
 )
 
+# Run the cyclic garbage collector less often (a full collection stalls in-flight requests)
+_gc_gen0, _gc_gen1, _gc_gen2 = gc.get_threshold()
+gc.set_threshold(_gc_gen0 * 10, _gc_gen1 * 3, _gc_gen2 * 3)
+
 # Define custom formatter
 class CustomFormatter(logging.Formatter):
     def format(self, record):
@@ -36,13 +56,16 @@ class CustomFormatter(logging.Formatter):
 log_dir = os.path.join(os.getcwd(), "logs")
 os.makedirs(log_dir, exist_ok=True)
 
+# Log file path (computed once)
+LOG_FILE_PATH = os.path.join(log_dir, 'mcp_server.log')
+
 # Configure logger
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # Configure handler
 handler = RotatingFileHandler(
-    os.path.join(log_dir, 'mcp_server.log'),
+    LOG_FILE_PATH,
     maxBytes=1048576,
     backupCount=5
 )
@@ -51,24 +74,205 @@ handler = RotatingFileHandler(
 formatter = CustomFormatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
 handler.setFormatter(formatter)
 
-# Add handler to logger
-logger.addHandler(handler)
+# Write log records from a background thread so file I/O (and rollover checks) stay off the event loop
+log_queue = queue.SimpleQueue()
+queue_handler = QueueHandler(log_queue)
+log_listener = QueueListener(log_queue, handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+# Add queue handler to logger (the listener thread owns the file handler)
+logger.addHandler(queue_handler)
+
+# Rule line used in tool boundary banners
+BANNER = "=" * 80
 
-# Helper function to output a blank line
-def log_newline():
-    """Write a simple newline to the log file"""
-    with open(os.path.join(log_dir, 'mcp_server.log'), 'a', encoding='utf-8') as f:
-        f.write('\n')
+# Helper function to output a tool boundary banner
+def log_banner(title: str, level: int = logging.INFO):
+    """Log a banner (blank line, rule, title, rule, blank line) as a single record"""
+    logger.log(level, f"\n{BANNER}\n{title}\n{BANNER}\n")
 
-# Global RAG instance
+# Global RAG instance (shared by graph_plan/graph_query, initialized on first use)
 rag = None
 read_dir_list = []
 storage_dir_path = None
 storage_name = None
 storage_desc = None
 
-# List to store pending tools for delayed registration
-pending_tools = []
+# Guards initialization/release of the shared RAG instance
+_rag_lock = asyncio.Lock()
+
+# In-flight tool calls per RAG instance (keyed by id), and replaced instances
+# waiting for their last in-flight call before they are finalized
+_rag_users: Dict[int, int] = {}
+_retired_rags: Dict[int, Any] = {}
+
+# Storage state the shared RAG instance was loaded from
+_rag_storage_signature = None
+
+# When the shared RAG instance's LLM response cache was last emptied (monotonic seconds)
+_llm_cache_reset_at = 0.0
+
+# Response cache for graph_plan/graph_query
+response_cache = SemanticCache(
+    threshold=query_cache_similarity_threshold,
+    ttl_seconds=query_cache_ttl_seconds,
+    max_entries=query_cache_max_entries,
+    semantic=query_cache_semantic_enabled
+) if query_cache_enabled else None
+
+# Cache namespaces (plan responses also depend on the plan prompt template)
+PLAN_CACHE_NAMESPACE = "graph_plan:" + hashlib.sha256(PLAN_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()
+QUERY_CACHE_NAMESPACE = "graph_query"
+
+def _storage_signature(storage_dir: str) -> int:
+    """
+    Latest modification time (ns) of the workspace storage files, used to detect updates on disk.
+    The LLM response cache is ignored because queries themselves write it.
+    """
+    workspace_dir_path = os.path.join(storage_dir, derive_storage_name(storage_dir) + "_work")
+    try:
+        with os.scandir(workspace_dir_path) as entries:
+            return max(
+                (entry.stat().st_mtime_ns for entry in entries
+                 if entry.is_file() and "llm_response_cache" not in entry.name),
+                default=0
+            )
+    except FileNotFoundError:
+        return 0
+
+async def _retire_rag():
+    """
+    Detach the shared RAG instance (caller holds _rag_lock).
+    The instance is finalized right away when idle, otherwise by its last in-flight tool call.
+    """
+    global rag
+
+    old_rag, rag = rag, None
+    if old_rag is None:
+        return
+    if _rag_users.get(id(old_rag)):
+        _retired_rags[id(old_rag)] = old_rag
+    else:
+        await old_rag.finalize_storages()
+
+async def get_rag():
+    """
+    Get the shared RAG instance for one tool call, initializing it on first use.
+    The instance is reloaded when the storage has been updated on disk (e.g. by another process).
+    Every call must be paired with put_rag() once the caller is done with the instance.
+    """
+    global rag, _rag_storage_signature, _llm_cache_reset_at
+
+    async with _rag_lock:
+        if rag is not None and await asyncio.to_thread(_storage_signature, storage_dir_path) != _rag_storage_signature:
+            logger.info("Storage changed on disk, reloading RAG instance")
+            await _retire_rag()
+            if response_cache is not None:
+                response_cache.clear()
+
+        if rag is None:
+            rag = await initialize_rag(storage_dir_path)
+
+            # Start with an empty LLM response cache so no answer outlives the storage it came from
+            await rag.llm_response_cache.drop()
+            _llm_cache_reset_at = time.monotonic()
+
+            _rag_storage_signature = await asyncio.to_thread(_storage_signature, storage_dir_path)
+
+        _rag_users[id(rag)] = _rag_users.get(id(rag), 0) + 1
+        return rag
+
+async def put_rag(instance):
+    """Mark one tool call as done with a RAG instance from get_rag(), finalizing it if it was replaced meanwhile."""
+    async with _rag_lock:
+        users = _rag_users[id(instance)] - 1
+        if users:
+            _rag_users[id(instance)] = users
+            return
+        del _rag_users[id(instance)]
+        retired_rag = _retired_rags.pop(id(instance), None)
+        if retired_rag is not None:
+            await retired_rag.finalize_storages()
+
+async def release_rag():
+    """Discard the shared RAG instance (if any); in-flight tool calls keep using it until they finish."""
+    async with _rag_lock:
+        await _retire_rag()
+        if response_cache is not None:
+            response_cache.clear()
+
+async def expire_llm_response_cache(rag):
+    """
+    Drop the LLM response cache once it is older than LLM_RESPONSE_CACHE_TTL_SECONDS
+    (0 drops it after every request). Repeated prompts within the TTL hit LightRAG's cache.
+    """
+    global _llm_cache_reset_at
+
+    if time.monotonic() - _llm_cache_reset_at >= llm_response_cache_ttl_seconds:
+        await rag.llm_response_cache.drop()
+        _llm_cache_reset_at = time.monotonic()
+
+def _is_cacheable_response(response) -> bool:
+    """Whether a query response may be cached (LightRAG's fail/no-context reply and empty responses are not)."""
+    return isinstance(response, str) and bool(response.strip()) and response.strip() != PROMPTS["fail_response"].strip()
+
+async def cached_aquery(rag, namespace: str, query: str, param: QueryParam):
+    """
+    Run rag.aquery, reusing a cached response for identical (or, if enabled, semantically similar) requests.
+
+    Args:
+        rag: LightRAG instance
+        namespace: Cache namespace of the calling tool
+        query: Request text
+        param: Query parameters
+
+    Returns:
+        The query response
+    """
+    if response_cache is None:
+        return await rag.aquery(query=query, param=param)
+
+    response = response_cache.get(namespace, query)
+    if response is not None:
+        return response
+
+    # Semantic matching needs the request's embedding (only computed after an exact miss)
+    embedding = None
+    if response_cache.semantic:
+        embedding = (await rag.embedding_func([query]))[0]
+        response = response_cache.get_similar(namespace, embedding)
+        if response is not None:
+            return response
+
+    response = await rag.aquery(query=query, param=param)
+    if _is_cacheable_response(response):
+        response_cache.put(namespace, query, response, embedding)
+    return response
+
+def _finalize_rag_at_exit():
+    """Finalize the shared RAG instance (and any replaced ones still pending) once when the server shuts down."""
+    for instance in [rag, *_retired_rags.values()]:
+        if instance is None:
+            continue
+        try:
+            asyncio.run(instance.finalize_storages())
+        except Exception as e:
+            logger.error(f"Failed to finalize storages at shutdown: {e}")
+
+atexit.register(_finalize_rag_at_exit)
+
+@dataclass(slots=True)
+class ToolSpec:
+    """Tool information stored for delayed registration"""
+    fn: Callable
+    name: Optional[str]
+    title: Optional[str]
+    annotations: Any
+    structured_output: Optional[bool]
+
+# Pending tools for delayed registration, keyed by function qualname
+pending_tools: Dict[str, ToolSpec] = {}
 
 mcp = FastMCP("LightRAGCoder")
 
@@ -76,15 +280,14 @@ def dynamic_tool(name=None, title=None, description=None, annotations=None, stru
     """Dynamic tool decorator that automatically adds storage information to description"""
 
     def decorator(fn):
-        # Store tool information for delayed registration
-        global pending_tools
-        pending_tools.append({
-            'fn': fn,
-            'name': name,
-            'title': title,
-            'annotations': annotations,
-            'structured_output': structured_output
-        })
+        # Store tool information for delayed registration (re-decorating replaces the entry)
+        pending_tools[fn.__qualname__] = ToolSpec(
+            fn=fn,
+            name=name,
+            title=title,
+            annotations=annotations,
+            structured_output=structured_output
+        )
         # Return the original function (not registered yet)
         return fn
     return decorator
@@ -93,8 +296,8 @@ def register_dynamic_tools():
     """Register all pending tools with the current storage description"""
     global pending_tools, storage_desc, mcp
 
-    for tool_info in pending_tools:
-        fn = tool_info['fn']
+    for tool_spec in pending_tools.values():
+        fn = tool_spec.fn
         # Build dynamic description: storage_desc + function docstring
         if storage_desc:
             # If storage_desc exists, combine into complete description
@@ -105,11 +308,11 @@ def register_dynamic_tools():
 
         # Register with mcp.tool(), passing dynamic description
         mcp.tool(
-            name=tool_info['name'],
-            title=tool_info['title'],
+            name=tool_spec.name,
+            title=tool_spec.title,
             description=dynamic_description,
-            annotations=tool_info['annotations'],
-            structured_output=tool_info['structured_output']
+            annotations=tool_spec.annotations,
+            structured_output=tool_spec.structured_output
         )(fn)
 
     # Clear pending tools after registration to avoid duplicate registration
@@ -132,34 +335,27 @@ async def graph_update() -> dict:
     global storage_dir_path
     global read_dir_list
 
-    log_newline()
-    logging.getLogger().info("=" * 80)
-    logging.getLogger().info("graph_update tool start")
-    logging.getLogger().info("=" * 80)
-
-    # Check if update is in progress
-    if check_lock_file_exists(storage_dir_path):
-        return {
-            "state": "Failed",
-            "result": GRAPH_STORAGE_UPDATE_PROCESSING.format(storage_name=storage_name)
-        }
+    log_banner("graph_update tool start")
 
     # Read source directories from settings.json
     if storage_dir_path:
-        source_dirs = storage_setting.get_source_dirs_from_settings(storage_dir_path)
+        source_dirs = await asyncio.to_thread(storage_setting.get_source_dirs_from_settings, storage_dir_path)
         if source_dirs:
             read_dir_list = source_dirs
-            logger.info(f"Updated read_dir_list from settings: {read_dir_list}")
+            # Lazy %-formatting: the list repr is only built when INFO is enabled
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Updated read_dir_list from settings: %s", read_dir_list)
         else:
-            logger.warning(f"No source directories found in settings.json")
+            logger.warning("No source directories found in settings.json")
 
     try:
         # Check if storage exists
-        storage_exists = os.path.exists(storage_dir_path)
+        storage_exists = await asyncio.to_thread(os.path.exists, storage_dir_path)
         action = "updated" if storage_exists else "created"
 
-        # Create graph storage
-        await create_graph_storage(read_dir_list, storage_dir_path)
+        # Create graph storage (takes the storage lock atomically; fails if an update is in progress).
+        # Once the lock is held, release the shared query instance so it is reloaded from the updated storage
+        await create_graph_storage(read_dir_list, storage_dir_path, on_locked=release_rag)
 
         result_message = GRAPH_STORAGE_RESULT_TEMPLATE.format(
             read_dir_path=read_dir_list,
@@ -167,21 +363,21 @@ async def graph_update() -> dict:
             action=action
         )
 
-        logger.info("")
-        logging.getLogger().info("=" * 80)
-        logging.getLogger().info("graph_update tool completed")
-        logging.getLogger().info("=" * 80)
-        log_newline()
+        log_banner("graph_update tool completed")
         return {"state": "SUCCESS", "result": result_message}
 
+    except StorageLockedError:
+        # Update is in progress
+        logger.warning("graph_update: storage update in progress")
+        return {
+            "state": "Failed",
+            "result": GRAPH_STORAGE_UPDATE_PROCESSING.format(storage_name=storage_name)
+        }
+
     except Exception as e:
         error_message = GENERAL_ERROR_TEMPLATE.format(error=str(e))
 
-        logger.info("")
-        logging.getLogger().error("=" * 80)
-        logging.getLogger().error("graph_update tool error")
-        logging.getLogger().error("=" * 80)
-        log_newline()
+        log_banner("graph_update tool error", logging.ERROR)
         return {"state": "Failed", "result": error_message}
     finally:
         # Ensure lock file is removed
@@ -209,34 +405,25 @@ async def graph_plan(user_request: str) -> dict:
     # Declare global variables at the beginning of the function
     global storage_name
     global storage_dir_path
-    global rag
     
-    log_newline()
-    logging.getLogger().info("=" * 80)
-    logging.getLogger().info("graph_plan tool start")
-    logging.getLogger().info("=" * 80)
-
+    # Fast early returns (a single log line, no banners) for clients polling during an update
     # Check if update is in progress
-    if check_lock_file_exists(storage_dir_path):
+    if await asyncio.to_thread(check_lock_file_exists, storage_dir_path):
+        logger.warning("graph_plan: storage update in progress")
         return {
             "state": "Failed",
             "result": GRAPH_STORAGE_UPDATE_PROCESSING.format(storage_name=storage_name)
         }
 
     # Check storage directory exists
-    if not os.path.exists(storage_dir_path):
-        
-        logging.getLogger().info("")
-        logging.getLogger().error("=" * 80)
-        logging.getLogger().error("graph_plan tool error: storage not found")
-        logging.getLogger().error("=" * 80)
-        log_newline()
-        
+    if not await asyncio.to_thread(os.path.exists, storage_dir_path):
+        logger.warning("graph_plan: storage not found")
         return {"state": "Failed", "result": STORAGE_NOT_FOUND_ERROR_TEMPLATE.format(storage_name=storage_name)}
 
+    log_banner("graph_plan tool start")
+
     CREATE_PLAN_PROMPT = PLAN_PROMPT_TEMPLATE.format(user_request=user_request)
 
-    rag = await initialize_rag(storage_dir_path)
     query_param = QueryParam(
         mode=search_mode,
         user_prompt=CREATE_PLAN_PROMPT,
@@ -245,23 +432,14 @@ async def graph_plan(user_request: str) -> dict:
         max_entity_tokens=entity_max_tokens,
         max_relation_tokens=relation_max_tokens,
     )
+    rag = await get_rag()
     try:
         # Create plan
-        plan = await rag.aquery(
-            query=user_request, 
-            param=query_param
-        )
+        plan = await cached_aquery(rag, PLAN_CACHE_NAMESPACE, user_request, query_param)
     finally:
-        await rag.finalize_storages()
-        
-        # Drop cache
-        await rag.llm_response_cache.drop()
-            
-        # Cleanup instance
-        del rag
-        
-        # Attempt global state cleanup
-        gc.collect()
+        # Drop cache when it has expired
+        await expire_llm_response_cache(rag)
+        await put_rag(rag)
 
     result_message = {
         "state": "SUCCESS",
@@ -269,11 +447,7 @@ async def graph_plan(user_request: str) -> dict:
         "result": plan
     }
     
-    logging.getLogger().info("")
-    logging.getLogger().info("=" * 80)
-    logging.getLogger().info("graph_plan tool completed")
-    logging.getLogger().info("=" * 80)
-    log_newline()
+    log_banner("graph_plan tool completed")
     
     return result_message
 
@@ -298,32 +472,23 @@ async def graph_query(user_query: str) -> dict:
     # Declare global variables at the beginning of the function
     global storage_name
     global storage_dir_path
-    global rag
     
-    log_newline()
-    logging.getLogger().info("=" * 80)
-    logging.getLogger().info("graph_query tool start")
-    logging.getLogger().info("=" * 80)
-
+    # Fast early returns (a single log line, no banners) for clients polling during an update
     # Check if update is in progress
-    if check_lock_file_exists(storage_dir_path):
+    if await asyncio.to_thread(check_lock_file_exists, storage_dir_path):
+        logger.warning("graph_query: storage update in progress")
         return {
             "state": "Failed",
             "result": GRAPH_STORAGE_UPDATE_PROCESSING.format(storage_name=storage_name)
         }
 
     # Check storage directory exists
-    if not os.path.exists(storage_dir_path):
-        
-        logging.getLogger().info("")
-        logging.getLogger().error("=" * 80)
-        logging.getLogger().error("graph_query tool error: storage not found")
-        logging.getLogger().error("=" * 80)
-        log_newline()
-        
+    if not await asyncio.to_thread(os.path.exists, storage_dir_path):
+        logger.warning("graph_query: storage not found")
         return {"state": "Failed", "result": STORAGE_NOT_FOUND_ERROR_TEMPLATE.format(storage_name=storage_name)}
 
-    rag = await initialize_rag(storage_dir_path)
+    log_banner("graph_query tool start")
+
     query_param = QueryParam(
         mode=search_mode,
         top_k=search_top_k,
@@ -331,23 +496,14 @@ async def graph_query(user_query: str) -> dict:
         max_entity_tokens=entity_max_tokens,
         max_relation_tokens=relation_max_tokens,
     )
+    rag = await get_rag()
     try:
         # Create answer
-        response = await rag.aquery(
-            query=user_query, 
-            param=query_param
-        )
+        response = await cached_aquery(rag, QUERY_CACHE_NAMESPACE, user_query, query_param)
     finally:
-        await rag.finalize_storages()
-        
-        # Drop cache
-        await rag.llm_response_cache.drop()
-            
-        # Cleanup instance
-        del rag
-        
-        # Attempt global state cleanup
-        gc.collect()
+        # Drop cache when it has expired
+        await expire_llm_response_cache(rag)
+        await put_rag(rag)
         
     result_message = {
         "state": "SUCCESS",
@@ -355,11 +511,7 @@ async def graph_query(user_query: str) -> dict:
         "result": response
     }
     
-    logging.getLogger().info("")
-    logging.getLogger().info("=" * 80)
-    logging.getLogger().info("graph_query tool completed")
-    logging.getLogger().info("=" * 80)
-    log_newline()
+    log_banner("graph_query tool completed")
     
     return result_message
 
@@ -1,10 +1,32 @@
+import copy
 import json
 import os
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, List, Tuple, Union
+from repo_graphrag.utils.storage_path import derive_storage_name
+
+# Use orjson for faster settings I/O when available
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 SETTINGS_FILENAME = "settings.json"
 
+# Parsed settings per settings.json path, with the file's (mtime in ns, size) they were read at
+_settings_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+def split_source_paths(spec: str) -> List[str]:
+    """Split a comma-separated source path string into a list of paths
+
+    Args:
+        spec: Comma-separated paths
+
+    Returns:
+        Paths stripped of surrounding whitespace, empty entries dropped (no other normalization)
+    """
+    return [path for path in map(str.strip, spec.split(',')) if path]
+
 def get_settings_path(storage_dir: str) -> str:
     """Get the full path of the settings.json file
 
@@ -26,12 +48,25 @@ def read_settings(storage_dir: str) -> Dict[str, Any]:
         Dictionary containing settings, or empty dict if file doesn't exist
     """
     settings_path = get_settings_path(storage_dir)
-    if not os.path.exists(settings_path):
+    try:
+        settings_stat = os.stat(settings_path)
+    except FileNotFoundError:
+        _settings_cache.pop(settings_path, None)
         return {}
+    file_state = (settings_stat.st_mtime_ns, settings_stat.st_size)
+
+    # Reuse the parsed settings while the file is unchanged
+    # (deep copy so callers can't modify the cache through nested lists)
+    cached = _settings_cache.get(settings_path)
+    if cached is not None and cached[0] == file_state:
+        return copy.deepcopy(cached[1])
 
     try:
-        with open(settings_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        # Parse raw bytes (both parsers decode UTF-8 themselves, no text-mode file layer)
+        settings_bytes = Path(settings_path).read_bytes()
+        settings = orjson.loads(settings_bytes) if orjson is not None else json.loads(settings_bytes)
+        _settings_cache[settings_path] = (file_state, settings)
+        return copy.deepcopy(settings)
     except (json.JSONDecodeError, IOError) as e:
         print(f"Warning: Unable to read settings file {settings_path}: {e}")
         return {}
@@ -47,13 +82,17 @@ def write_settings(storage_dir: str, settings: Dict[str, Any]) -> bool:
         True if successful, False if failed
     """
     settings_path = get_settings_path(storage_dir)
+    _settings_cache.pop(settings_path, None)
 
     try:
         # Ensure storage directory exists
         os.makedirs(storage_dir, exist_ok=True)
 
-        with open(settings_path, 'w', encoding='utf-8') as f:
-            json.dump(settings, f, indent=2, ensure_ascii=False)
+        if orjson is not None:
+            Path(settings_path).write_bytes(orjson.dumps(settings, option=orjson.OPT_INDENT_2))
+        else:
+            with open(settings_path, 'w', encoding='utf-8') as f:
+                json.dump(settings, f, indent=2, ensure_ascii=False)
         return True
     except IOError as e:
         print(f"Error: Unable to write settings file {settings_path}: {e}")
@@ -121,7 +160,7 @@ def get_source_dirs_from_settings(storage_dir: str) -> List[str]:
     source_dir_value = get_setting(storage_dir, 'source_dir', [])
     if isinstance(source_dir_value, str):
         # Backward compatibility: convert comma-separated string to list
-        dirs = [path.strip() for path in source_dir_value.split(',') if path.strip()]
+        dirs = split_source_paths(source_dir_value)
     elif isinstance(source_dir_value, list):
         dirs = source_dir_value
     else:
@@ -143,19 +182,17 @@ def create_default_settings(storage_dir: str, name: str = None, description: str
         True if successful, False if failed
     """
     if name is None:
-        name = os.path.basename(storage_dir) if storage_dir else "unnamed"
+        name = derive_storage_name(storage_dir) if storage_dir else "unnamed"
 
     # Convert source_dir to list if it's a string
     if isinstance(source_dir, str):
-        source_dir_list = [path.strip() for path in source_dir.split(',') if path.strip()]
+        source_dir_list = split_source_paths(source_dir)
     elif isinstance(source_dir, list):
         source_dir_list = source_dir
     else:
         source_dir_list = []
 
     # Store original paths, no normalization
-    # source_dir_list already contains the paths
-
     default_settings = {
         'name': name,
         'description': description or '',